@@ -1,8 +1,26 @@
-import random
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
 import string
-from collections import defaultdict
+import sys
+import time
+import tracemalloc
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, groupby, product
 from math import comb
 
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:  # large tables fall back to a dense support matrix
+    sparse = None
+
 # ===== Behavior Model Parameters =====
 
 # --- President lying probabilities ---
@@ -23,6 +41,30 @@ P_L_CHAN_ENACT_L = 0.7  # Probability that a Liberal Chancellor enacts a Liberal
 # how strong social propagation should be
 SOCIAL_INFLUENCE = 0.35  # tweak this
 
+# tables up to this size keep the support graph as a dense matrix
+DENSE_SUPPORT_MAX = 10
+
+# parameters that shape the role posterior (fitted by --calibrate, loaded by --params)
+BEHAVIOR_PARAMS = (
+    "P_F_PRES_LIES", "P_L_PRES_LIES", "P_F_CHAN_LIES", "P_L_CHAN_LIES",
+    "P_F_CHAN_ENACT_F", "P_L_CHAN_ENACT_F", "P_F_CHAN_ENACT_L", "P_L_CHAN_ENACT_L",
+)
+
+
+def behavior_params():
+    return {name: globals()[name] for name in BEHAVIOR_PARAMS}
+
+
+def load_params(path):
+    """Override the behavior model constants from a JSON file written by --calibrate."""
+    with open(path) as fp:
+        data = json.load(fp)
+    params = data.get("params", data)
+    unknown = set(params) - set(BEHAVIOR_PARAMS) - {"SOCIAL_INFLUENCE"}
+    if unknown:
+        raise ValueError(f"unknown parameters in {path}: {', '.join(sorted(unknown))}")
+    globals().update(params)
+
 
 def deck_likelihood(draw_F, deck_F, deck_L):
     total_cards = deck_F + deck_L
@@ -31,10 +73,47 @@ def deck_likelihood(draw_F, deck_F, deck_L):
     return comb(deck_F, draw_F) * comb(deck_L, 3 - draw_F) / comb(total_cards, 3)
 
 
-def likelihood_of_obs(obs, assignment, deck_F, deck_L, player_scores):
+def fascist_masks(n, f):
+    """Every assignment of f fascists among n players, as bitmasks (bit i set = player i is F)."""
+    if n > 16:
+        raise ValueError("at most 16 players fit in a uint16 role bitmask")
+    return np.array([sum(1 << i for i in c) for c in combinations(range(n), f)], dtype=np.uint16)
+
+
+def role_bits(particles, idx):
+    """Boolean array: is player idx a Fascist in each particle?"""
+    return ((particles >> idx) & 1).astype(bool)
+
+
+def behavior_table(claim_mismatch, enacted_F, params):
+    """Lie * enact likelihood for each (pres_role, chan_role) pair, 1 = Fascist."""
+    table = np.empty((2, 2))
+    for pres_F in (0, 1):
+        for chan_F in (0, 1):
+            # 2) lying likelihood
+            pres_lie_prob = params["P_F_PRES_LIES"] if pres_F else params["P_L_PRES_LIES"]
+            chan_lie_prob = params["P_F_CHAN_LIES"] if chan_F else params["P_L_CHAN_LIES"]
+            if claim_mismatch:
+                lie_like = 1 - (1 - pres_lie_prob) * (1 - chan_lie_prob)
+            else:
+                lie_like = (1 - pres_lie_prob) * (1 - chan_lie_prob)
+
+            # 3) enactment likelihood
+            if enacted_F:
+                enact_like = params["P_F_CHAN_ENACT_F"] if chan_F else params["P_L_CHAN_ENACT_F"]
+            else:
+                enact_like = params["P_F_CHAN_ENACT_L"] if chan_F else params["P_L_CHAN_ENACT_L"]
+
+            table[pres_F, chan_F] = lie_like * enact_like
+    return table
+
+
+def compile_obs_table(obs, deck_F, deck_L, player_scores):
+    """Likelihood of one round's observation for each (pres_role, chan_role) pair, 1 = Fascist.
+
+    player_scores is the per-player suspicion vector.
+    """
     pres_idx, chan_idx, pres_claim_draw, pres_claim_pass, chan_claim_got, enacted = obs
-    pres_role = assignment[pres_idx]
-    chan_role = assignment[chan_idx]
 
     draw_F = int(pres_claim_draw[0])
     pass_F_pres = int(pres_claim_pass[0])
@@ -44,49 +123,915 @@ def likelihood_of_obs(obs, assignment, deck_F, deck_L, player_scores):
     # 1) how plausible the draw was
     deck_like = deck_likelihood(draw_F, deck_F, deck_L)
 
-    # 2) lying likelihood
-    if claim_mismatch:
-        pres_lie_prob = P_F_PRES_LIES if pres_role == "F" else P_L_PRES_LIES
-        chan_lie_prob = P_F_CHAN_LIES if chan_role == "F" else P_L_CHAN_LIES
-        lie_like = 1 - (1 - pres_lie_prob) * (1 - chan_lie_prob)
+    # 4) reputation multiplier
+    pres_score = 1 + player_scores[pres_idx] * 0.5
+    chan_score = 1 + player_scores[chan_idx] * 0.5
+
+    table = behavior_table(claim_mismatch, enacted.upper() == "F", behavior_params())
+    return deck_like * table * pres_score * chan_score
+
+
+def gather_obs_table(table, obs, particles):
+    """Look up each particle's entry in a compiled (pres_role, chan_role) table."""
+    pres_idx, chan_idx = obs[0], obs[1]
+    return table[(particles >> pres_idx) & 1, (particles >> chan_idx) & 1]
+
+
+def log_likelihood_of_obs(obs, particles, deck_F, deck_L, player_scores):
+    with np.errstate(divide="ignore"):
+        log_table = np.log(compile_obs_table(obs, deck_F, deck_L, player_scores))
+    return gather_obs_table(log_table, obs, particles)
+
+
+def normalize_log_weights(log_weights):
+    top = log_weights.max()
+    return log_weights - (top + np.log(np.exp(log_weights - top).sum()))
+
+
+def effective_sample_size(weights):
+    return 1.0 / np.square(weights).sum()
+
+
+def systematic_resample(weights, rng):
+    n = len(weights)
+    positions = (rng.random() + np.arange(n)) / n
+    return np.minimum(np.searchsorted(np.cumsum(weights), positions), n - 1)
+
+
+def residual_resample(weights, rng):
+    n = len(weights)
+    scaled = n * weights
+    copies = np.floor(scaled).astype(np.int64)
+    idx = np.repeat(np.arange(n), copies)
+    remaining = n - len(idx)
+    if remaining:
+        residual = scaled - copies
+        idx = np.concatenate([idx, rng.choice(n, size=remaining, p=residual / residual.sum())])
+    return idx
+
+
+def multinomial_resample(weights, rng):
+    return rng.choice(len(weights), size=len(weights), p=weights)
+
+
+RESAMPLERS = {
+    "systematic": systematic_resample,
+    "residual": residual_resample,
+    "multinomial": multinomial_resample,
+}
+
+
+def resample_by_weights(particles, weights, rng, method="systematic"):
+    return particles[RESAMPLERS[method](weights, rng)]
+
+
+def estimate_marginals(particles, n, weights):
+    return np.array([weights @ role_bits(particles, i) for i in range(n)])
+
+
+class ParticleEngine:
+    """Monte Carlo posterior over role assignments, one uint16 bitmask per particle.
+
+    Weights accumulate in log space and particles are only resampled once the
+    effective sample size drops below ess_threshold * num_particles.
+    """
+
+    def __init__(self, n, f, num_particles=10000, rng=None, resampler="systematic", ess_threshold=0.5):
+        self.n = n
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.resampler = resampler
+        self.ess_threshold = ess_threshold
+        masks = fascist_masks(n, f)
+        self.particles = masks[self.rng.integers(len(masks), size=num_particles)]
+        self.log_weights = np.full(num_particles, -np.log(num_particles))
+        self.ess = float(num_particles)
+
+    @classmethod
+    def from_args(cls, args, n, f, rng=None):
+        return cls(n, f, num_particles=args.particles,
+                   rng=rng if rng is not None else np.random.default_rng(args.seed),
+                   resampler=args.resampler, ess_threshold=args.ess_threshold)
+
+    def update(self, obs, deck_F, deck_L, player_scores):
+        log_weights = self.log_weights + log_likelihood_of_obs(obs, self.particles, deck_F, deck_L, player_scores)
+        if log_weights.max() == -np.inf:
+            # observation impossible for every particle, keep the current posterior
+            return
+        self.log_weights = normalize_log_weights(log_weights)
+        weights = np.exp(self.log_weights)
+        self.ess = effective_sample_size(weights)
+        num_particles = len(self.particles)
+        if self.ess < self.ess_threshold * num_particles:
+            self.particles = resample_by_weights(self.particles, weights, self.rng, self.resampler)
+            self.log_weights = np.full(num_particles, -np.log(num_particles))
+
+    def marginals(self):
+        return estimate_marginals(self.particles, self.n, np.exp(self.log_weights))
+
+
+class ExactEngine:
+    """Exact posterior: one log-probability per possible role assignment (at most C(16, 8))."""
+
+    def __init__(self, n, f):
+        self.n = n
+        self.assignments = fascist_masks(n, f)
+        self.log_probs = np.full(len(self.assignments), -np.log(len(self.assignments)))
+        self.fascist_matrix = np.stack([role_bits(self.assignments, i) for i in range(n)], axis=1).astype(float)
+
+    @classmethod
+    def from_args(cls, args, n, f, rng=None):
+        return cls(n, f)
+
+    def update(self, obs, deck_F, deck_L, player_scores):
+        log_probs = self.log_probs + log_likelihood_of_obs(obs, self.assignments, deck_F, deck_L, player_scores)
+        if log_probs.max() == -np.inf:
+            # observation impossible under every assignment, keep the current posterior
+            return
+        self.log_probs = normalize_log_weights(log_probs)
+
+    def marginals(self):
+        return np.exp(self.log_probs) @ self.fascist_matrix
+
+
+ENGINES = {"particle": ParticleEngine, "exact": ExactEngine}
+
+
+def make_engine(args, n, f, rng=None):
+    if args.engine not in ENGINES:
+        raise ValueError(f"unknown engine {args.engine!r}, expected one of {', '.join(sorted(ENGINES))}")
+    return ENGINES[args.engine].from_args(args, n, f, rng)
+
+
+def parse_support(line):
+    """Parse "A:E,B:D" (A supported E, B supported D) into [("A", "E"), ("B", "D")]."""
+    pairs = []
+    for pair in line.split(","):
+        if ":" in pair:
+            src, dst = pair.split(":", 1)
+            pairs.append((src.strip().upper(), dst.strip().upper()))
+    return pairs
+
+
+class SupportGraph:
+    """Supporter -> supported edge weights as an adjacency matrix.
+
+    Dense NumPy for normal tables, scipy.sparse (when available) above
+    DENSE_SUPPORT_MAX players. With decay < 1 older support fades each round.
+    """
+
+    def __init__(self, n, decay=1.0):
+        self.decay = decay
+        if n > DENSE_SUPPORT_MAX and sparse is not None:
+            self.weights = sparse.dok_matrix((n, n))
+        else:
+            self.weights = np.zeros((n, n))
+
+    def add(self, src_idx, dst_idx, count=1):
+        self.weights[src_idx, dst_idx] += count
+
+    def influence(self, player_scores):
+        """Suspicion each player inherits from the suspicious players supporting them."""
+        src_sus = np.clip(player_scores, 0, None)
+        if sparse is not None and sparse.issparse(self.weights):
+            return self.weights.tocsr().T @ src_sus
+        return self.weights.T @ src_sus
+
+    def step(self):
+        if self.decay != 1.0:
+            self.weights *= self.decay
+
+
+class InferenceSession:
+    """Everything the assistant tracks for one game: posterior, suspicion, support graph and deck."""
+
+    def __init__(self, players, engine, deck_F=11, deck_L=6, support_decay=1.0):
+        self.players = players
+        self.index = {name: i for i, name in enumerate(players)}
+        self.engine = engine
+        self.deck_F = deck_F
+        self.deck_L = deck_L
+        self.round_num = 1
+
+        # suspicion tracker
+        self.player_scores = np.zeros(len(players))
+
+        # support graph: supporter -> supported counts
+        self.support_graph = SupportGraph(len(players), decay=support_decay)
+
+    def observe(self, pres, chan, pres_draw, pres_pass, chan_got, enacted):
+        pres_idx = self.index[pres]
+        chan_idx = self.index[chan]
+
+        obs = (pres_idx, chan_idx, pres_draw, pres_pass, chan_got, enacted)
+
+        # 1) weight update
+        self.engine.update(obs, self.deck_F, self.deck_L, self.player_scores)
+
+        # 2) base suspicion update from round
+        mismatch = int(pres_pass[0]) != int(chan_got[0])
+        if mismatch:
+            self.player_scores[pres_idx] += 1.0
+            self.player_scores[chan_idx] += 1.0
+        if enacted == "F":
+            # chancellor involved in F tends to be a bit more sus
+            self.player_scores[chan_idx] += 0.5
+
+    def add_support(self, pairs):
+        for src, dst in pairs:
+            if src in self.index and dst in self.index:
+                self.support_graph.add(self.index[src], self.index[dst])
+
+    def propagate(self):
+        # if a suspicious player keeps defending someone, that someone becomes more suspicious;
+        # more repeats → stronger
+        self.player_scores += SOCIAL_INFLUENCE * self.support_graph.influence(self.player_scores) / self.round_num
+
+    def end_round(self, enacted):
+        """Remove the enacted card from the deck; returns True if the deck had to be reshuffled."""
+        if enacted == "F":
+            self.deck_F -= 1
+        else:
+            self.deck_L -= 1
+        self.round_num += 1
+        self.support_graph.step()
+
+        # reshuffle if deck too low
+        if self.deck_F + self.deck_L < 3:
+            self.deck_F, self.deck_L = 11, 6
+            return True
+        return False
+
+    def marginals(self):
+        return self.engine.marginals()
+
+    def suspicion(self):
+        return self.player_scores.tolist()
+
+
+# ===== Batch / stream replay =====
+#
+# A replay file is JSONL. Consecutive records sharing a "game" value form one
+# game; its first record sets it up, every later record is one round:
+#   {"game": "g1", "players": 7, "fascists": 3, "deck_F": 11, "deck_L": 6}
+#   {"game": "g1", "president": "A", "chancellor": "C", "pres_draw": "2F1L",
+#    "pres_pass": "1F1L", "chan_got": "1F1L", "enacted": "F", "support": "A:E,B:D"}
+# "players" is either a count (named A, B, C, ...) or a list of names, and
+# "support" may also be a list of "A:E" strings.
+
+def read_records(fp):
+    for line in fp:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def is_count(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def session_from_setup(setup, args, rng=None):
+    where = f"game {setup.get('game') if isinstance(setup, dict) else None!r}"
+    if not isinstance(setup, dict) or "players" not in setup or "fascists" not in setup:
+        raise ValueError(f"{where}: setup record needs 'players' and 'fascists'")
+    players = setup["players"]
+    if is_count(players) and players <= len(string.ascii_uppercase):
+        players = [string.ascii_uppercase[i] for i in range(players)]
+    elif isinstance(players, list) and all(isinstance(p, (str, int)) for p in players):
+        players = [str(p).upper() for p in players]
     else:
-        pres_lie_prob = P_F_PRES_LIES if pres_role == "F" else P_L_PRES_LIES
-        chan_lie_prob = P_F_CHAN_LIES if chan_role == "F" else P_L_CHAN_LIES
-        lie_like = (1 - pres_lie_prob) * (1 - chan_lie_prob)
+        raise ValueError(f"{where}: 'players' must be a count or a list of names, got {players!r}")
+    if len(set(players)) != len(players):
+        raise ValueError(f"{where}: duplicate player names")
+    fascists = setup["fascists"]
+    if not is_count(fascists) or fascists > len(players):
+        raise ValueError(f"{where}: 'fascists' must be a count between 0 and {len(players)}, got {fascists!r}")
+    deck_F, deck_L = setup.get("deck_F", 11), setup.get("deck_L", 6)
+    if not is_count(deck_F) or not is_count(deck_L):
+        raise ValueError(f"{where}: 'deck_F' and 'deck_L' must be card counts")
+    engine = make_engine(args, len(players), fascists, rng)
+    return InferenceSession(players, engine, deck_F, deck_L, support_decay=args.support_decay)
+
+
+def parse_claim(rec, field, where):
+    """A count claim like "2F1L"; only the leading F count is used."""
+    claim = rec[field]
+    if not isinstance(claim, str) or not claim.strip()[:1].isdigit():
+        raise ValueError(f"{where}: {field!r} must be a claim like \"2F1L\", got {claim!r}")
+    return claim.strip().upper()
+
+
+def parse_round(session, rec, game_id=None):
+    """Check one round record without touching the session.
+
+    Returns (pres, chan, pres_draw, pres_pass, chan_got, enacted, support_pairs)
+    so a malformed record is rejected before any of it is applied.
+    """
+    where = f"game {game_id!r} round {session.round_num}"
+    if not isinstance(rec, dict):
+        raise ValueError(f"{where}: round record must be an object, got {type(rec).__name__}")
+    names = []
+    for field in ("president", "chancellor"):
+        name = rec[field]
+        if not isinstance(name, (str, int)) or isinstance(name, bool):
+            raise ValueError(f"{where}: {field!r} must be a player name, got {name!r}")
+        names.append(str(name).upper())
+    pres, chan = names
+    if pres not in session.index or chan not in session.index:
+        raise ValueError(f"{where}: unknown player {pres!r} or {chan!r}")
+    claims = [parse_claim(rec, field, where) for field in ("pres_draw", "pres_pass", "chan_got")]
+    enacted = rec["enacted"]
+    if not isinstance(enacted, str) or enacted.strip().upper() not in ("F", "L"):
+        raise ValueError(f"{where}: 'enacted' must be \"F\" or \"L\", got {enacted!r}")
+
+    support = rec.get("support") or []
+    if isinstance(support, list) and all(isinstance(pair, str) for pair in support):
+        support = ",".join(support)
+    if not isinstance(support, str):
+        raise ValueError(f"{where}: 'support' must be \"A:E,B:D\" or a list of \"A:E\" strings")
+    return (pres, chan, *claims, enacted.strip().upper(), parse_support(support))
+
+
+def play_record(session, rec, game_id=None):
+    """Apply one round record to a session and return the per-round result record."""
+    players = session.players
+    pres, chan, pres_draw, pres_pass, chan_got, enacted, support = parse_round(session, rec, game_id)
+    round_num = session.round_num
 
-    # 3) enactment likelihood
-    if enacted.upper() == "F":
-        enact_like = P_F_CHAN_ENACT_F if chan_role == "F" else P_L_CHAN_ENACT_F
+    session.observe(pres, chan, pres_draw, pres_pass, chan_got, enacted)
+    session.add_support(support)
+    session.propagate()
+    marginals = session.marginals()
+    session.end_round(enacted)
+
+    return {
+        "game": game_id,
+        "round": round_num,
+        "president": pres,
+        "chancellor": chan,
+        "enacted": enacted,
+        "marginals": {name: round(float(p), 6) for name, p in zip(players, marginals)},
+        "sus": {name: round(s, 6) for name, s in zip(players, session.suspicion())},
+        "deck_after": {"F": session.deck_F, "L": session.deck_L},
+    }
+
+
+def replay_game(records, args, rng=None):
+    """Run one game's records through a fresh session, yielding a result record per round."""
+    records = iter(records)
+    setup = next(records)
+    session = session_from_setup(setup, args, rng)
+    for rec in records:
+        yield play_record(session, rec, setup.get("game"))
+
+
+def replay_games(records, args):
+    """Stream result records for every game in a record stream, one game in memory at a time."""
+    rng = np.random.default_rng(args.seed)
+    for _, game_records in groupby(records, key=lambda rec: rec.get("game")):
+        yield from replay_game(game_records, args, rng)
+
+
+def run_replay(args):
+    src = sys.stdin if args.replay == "-" else open(args.replay)
+    dst = sys.stdout if args.output in (None, "-") else open(args.output, "w")
+    try:
+        for result in replay_games(read_records(src), args):
+            dst.write(json.dumps(result) + "\n")
+    finally:
+        if src is not sys.stdin:
+            src.close()
+        if dst is not sys.stdout:
+            dst.close()
+
+
+# ===== Calibration =====
+#
+# Fits the behavior model constants to labelled games: replay-format corpora
+# whose setup records also carry "roles", a string like "LFLLHLF" in player
+# order (H counts as F). The score is the mean negative log posterior of the
+# true assignment after each round. Deck plausibility and the reputation
+# multiplier are the same for every assignment, so they cancel in the
+# posterior and only the lie/enact terms are fitted.
+
+CALIBRATION_GRID = {
+    "P_F_PRES_LIES": np.linspace(0.1, 0.9, 9),
+    "P_F_CHAN_LIES": np.linspace(0.1, 0.9, 9),
+    "P_F_CHAN_ENACT_F": np.linspace(0.1, 0.9, 9),
+    "P_F_CHAN_ENACT_L": np.linspace(0.1, 0.9, 9),
+}
+
+# keeps log() finite when a grid point makes an observation impossible
+CALIBRATION_FLOOR = 1e-9
+
+
+def encode_game(setup, rounds):
+    """Reduce a labelled game to (obs_class, role_code, true_idx) arrays.
+
+    obs_class[r] = 2 * claim_mismatch + enacted_F for round r, and
+    role_code[r, a] = 2 * pres_F + chan_F under assignment a.
+    """
+    players = setup["players"]
+    if isinstance(players, int):
+        players = [string.ascii_uppercase[i] for i in range(players)]
+    index = {str(name).upper(): i for i, name in enumerate(players)}
+    assignments = fascist_masks(len(players), setup["fascists"])
+    true_mask = sum(1 << i for i, role in enumerate(setup["roles"].upper()) if role in "FH")
+    true_idx = int(np.flatnonzero(assignments == true_mask)[0])
+
+    obs_class, role_code = [], []
+    for rec in rounds:
+        pres_idx = index[str(rec["president"]).upper()]
+        chan_idx = index[str(rec["chancellor"]).upper()]
+        mismatch = int(rec["pres_pass"].strip()[0]) != int(rec["chan_got"].strip()[0])
+        obs_class.append(2 * mismatch + (rec["enacted"].strip().upper() == "F"))
+        role_code.append(2 * ((assignments >> pres_idx) & 1) + ((assignments >> chan_idx) & 1))
+    return np.array(obs_class, dtype=np.int8), np.array(role_code, dtype=np.int8), true_idx
+
+
+# bump when encode_game's output changes so stale cache entries are ignored
+ENCODING_VERSION = 1
+
+
+def default_cache_dir():
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "secret-hitler")
+
+
+def corpus_cache_path(path, cache_dir):
+    """Cache file for a corpus, keyed on its location, size, mtime and the encoding version."""
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}\0{stat.st_size}\0{stat.st_mtime_ns}\0{ENCODING_VERSION}"
+    return os.path.join(cache_dir, hashlib.sha256(key.encode()).hexdigest()[:32] + ".npz")
+
+
+def load_encoded(cache_path):
+    # plain arrays only: allow_pickle=False means a tampered cache cannot run code
+    with np.load(cache_path, allow_pickle=False) as data:
+        true_idx = data["true_idx"]
+        return [(data[f"obs_{i}"], data[f"role_{i}"], int(idx)) for i, idx in enumerate(true_idx)]
+
+
+def save_encoded(cache_path, games):
+    arrays = {"true_idx": np.array([game[2] for game in games], dtype=np.int64)}
+    for i, (obs_class, role_code, _) in enumerate(games):
+        arrays[f"obs_{i}"] = obs_class
+        arrays[f"role_{i}"] = role_code
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as fp:
+        np.savez(fp, **arrays)
+    os.replace(tmp_path, cache_path)
+
+
+def encode_corpus(path, cache_dir=None):
+    """Encode every labelled game in a corpus, reusing a cached encoding under cache_dir.
+
+    Pass cache_dir="" to disable the cache. Cache I/O errors are reported and
+    the corpus is encoded from scratch.
+    """
+    cache_path = None
+    if cache_dir != "":
+        cache_path = corpus_cache_path(path, cache_dir or default_cache_dir())
+        try:
+            return load_encoded(cache_path)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            print(f"ignoring unreadable corpus cache {cache_path}: {e}", file=sys.stderr)
+
+    games = []
+    with open(path) as fp:
+        for _, game_records in groupby(read_records(fp), key=lambda rec: rec.get("game")):
+            setup = next(game_records)
+            rounds = list(game_records)
+            if "roles" in setup and rounds:
+                games.append(encode_game(setup, rounds))
+    if cache_path is not None:
+        try:
+            save_encoded(cache_path, games)
+        except OSError as e:
+            print(f"not caching encoded corpus: {e}", file=sys.stderr)
+    return games
+
+
+def log_behavior_tables(params):
+    """(obs_class, role_code) -> log likelihood under one parameter setting."""
+    tables = np.empty((4, 4))
+    for mismatch in (0, 1):
+        for enacted_F in (0, 1):
+            tables[2 * mismatch + enacted_F] = behavior_table(mismatch, enacted_F, params).ravel()
+    return np.log(np.maximum(tables, CALIBRATION_FLOOR))
+
+
+def game_nll(game, log_tables):
+    """Sum over rounds of -log P(true assignment | observations so far)."""
+    obs_class, role_code, true_idx = game
+    log_probs = np.cumsum(log_tables[obs_class[:, None], role_code], axis=0)
+    top = log_probs.max(axis=1)
+    log_norm = top + np.log(np.exp(log_probs - top[:, None]).sum(axis=1))
+    return float((log_norm - log_probs[:, true_idx]).sum())
+
+
+_worker_games = None
+
+
+def _init_calibration_worker(games):
+    global _worker_games
+    _worker_games = games
+
+
+def _score_params(params):
+    log_tables = log_behavior_tables(params)
+    return sum(game_nll(game, log_tables) for game in _worker_games), params
+
+
+def calibration_grid(overrides):
+    """Expand the default grid, with NAME=v1,v2,... overrides, into full parameter dicts."""
+    grid = dict(CALIBRATION_GRID)
+    for spec in overrides or []:
+        name, _, values = spec.partition("=")
+        if name not in BEHAVIOR_PARAMS:
+            raise ValueError(f"cannot calibrate unknown parameter {name!r}")
+        grid[name] = [float(v) for v in values.split(",")]
+    base = behavior_params()
+    names = list(grid)
+    for values in product(*(grid[name] for name in names)):
+        params = dict(base)
+        params.update(zip(names, (float(v) for v in values)))
+        yield params
+
+
+def run_calibration(args):
+    games = encode_corpus(args.calibrate, args.cache_dir)
+    if not games:
+        raise ValueError(f"{args.calibrate} has no labelled games (setup records need 'roles')")
+    num_rounds = sum(len(game[0]) for game in games)
+    grid = list(calibration_grid(args.grid))
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_calibration_worker,
+                             initargs=(games,)) as pool:
+        chunksize = max(1, len(grid) // (4 * (args.workers or os.cpu_count() or 1)))
+        best_nll, best_params = min(pool.map(_score_params, grid, chunksize=chunksize), key=lambda r: r[0])
+
+    result = {
+        "params": best_params,
+        "mean_nll": best_nll / num_rounds,
+        "games": len(games),
+        "rounds": num_rounds,
+        "grid_points": len(grid),
+    }
+    out = json.dumps(result, indent=2)
+    if args.output in (None, "-"):
+        print(out)
     else:
-        enact_like = P_F_CHAN_ENACT_L if chan_role == "F" else P_L_CHAN_ENACT_L
+        with open(args.output, "w") as fp:
+            fp.write(out + "\n")
 
-    # 4) reputation multiplier
-    pres_score = 1 + player_scores[pres_idx]["sus"] * 0.5
-    chan_score = 1 + player_scores[chan_idx]["sus"] * 0.5
 
-    return deck_like * lie_like * enact_like * pres_score * chan_score
+# ===== Benchmark =====
+#
+# Plays synthetic games with known roles through the real deck (11F/6L,
+# draw 3, reshuffle discards) and the behavior model's lie/enact rates, then
+# replays them through each engine configuration and scores the marginals.
+
+# fascists including Hitler, per player count
+FASCISTS_BY_PLAYERS = {5: 2, 6: 2, 7: 3, 8: 3, 9: 4, 10: 4}
 
 
-def resample_by_weights(particles, weights):
-    total = sum(weights)
-    if total == 0:
-        return [random.choice(particles) for _ in range(len(particles))]
-    probs = [w / total for w in weights]
-    return random.choices(particles, weights=probs, k=len(particles))
+def claim(num_F, num_cards, lie, rng):
+    """Format a claim like "1F1L", replacing the true count when lying."""
+    if lie:
+        num_F = int(rng.choice([k for k in range(num_cards + 1) if k != num_F]))
+    return f"{num_F}F{num_cards - num_F}L"
 
 
-def estimate_marginals(particles):
-    n = len(particles[0])
-    counts = [0.0] * n
-    for a in particles:
-        for i in range(n):
-            if a[i] == "F":
-                counts[i] += 1
-    total = len(particles)
-    return [c / total for c in counts]
+def synthetic_game(game_id, n, num_rounds, rng, params=None):
+    """Yield a labelled replay-format game: setup record then one record per round."""
+    params = params or behavior_params()
+    f = FASCISTS_BY_PLAYERS[n]
+    is_F = np.zeros(n, dtype=bool)
+    is_F[rng.choice(n, size=f, replace=False)] = True
+    players = [string.ascii_uppercase[i] for i in range(n)]
+    yield {"game": game_id, "players": n, "fascists": f, "roles": "".join("F" if x else "L" for x in is_F)}
+
+    deck = rng.permutation(["F"] * 11 + ["L"] * 6).tolist()
+    discards = []
+    for r in range(num_rounds):
+        pres = r % n
+        chan = int(rng.choice([i for i in range(n) if i != pres]))
+        if len(deck) < 3:
+            deck.extend(discards)
+            discards.clear()
+            rng.shuffle(deck)
+        drawn = [deck.pop() for _ in range(3)]
+        draw_F = drawn.count("F")
+
+        # Liberals bury a Fascist card when they can, Fascists bury a Liberal one
+        bury = "L" if is_F[pres] else "F"
+        discard = bury if bury in drawn else drawn[0]
+        drawn.remove(discard)
+        discards.append(discard)
+        pass_F = drawn.count("F")
+
+        if pass_F == 1:
+            p_enact_F = params["P_F_CHAN_ENACT_F"] if is_F[chan] else params["P_L_CHAN_ENACT_F"]
+            enacted = "F" if rng.random() < p_enact_F else "L"
+        else:
+            enacted = "F" if pass_F == 2 else "L"
+        drawn.remove(enacted)
+        discards.extend(drawn)
+
+        pres_lies = rng.random() < (params["P_F_PRES_LIES"] if is_F[pres] else params["P_L_PRES_LIES"])
+        chan_lies = rng.random() < (params["P_F_CHAN_LIES"] if is_F[chan] else params["P_L_CHAN_LIES"])
+        yield {
+            "game": game_id,
+            "president": players[pres],
+            "chancellor": players[chan],
+            "pres_draw": claim(draw_F, 3, pres_lies, rng),
+            "pres_pass": claim(pass_F, 2, pres_lies, rng),
+            "chan_got": claim(pass_F, 2, chan_lies, rng),
+            "enacted": enacted,
+        }
 
 
-def main():
+def benchmark_configs(args):
+    configs = []
+    for engine in args.bench_engines.split(","):
+        if engine == "exact":
+            configs.append({"engine": "exact"})
+            continue
+        for num_particles in args.bench_particles.split(","):
+            for resampler in args.bench_resamplers.split(","):
+                configs.append({"engine": engine, "particles": int(num_particles), "resampler": resampler})
+    return configs
+
+
+def score_round(marginals, truth, k):
+    p = np.clip(marginals, 1e-12, 1 - 1e-12)
+    brier = float(np.mean((marginals - truth) ** 2))
+    log_loss = float(-np.mean(truth * np.log(p) + (1 - truth) * np.log(1 - p)))
+    top_k_hits = float(truth[np.argsort(-marginals)[:k]].mean())
+    return brier, log_loss, top_k_hits
+
+
+def benchmark_config(config, games, args):
+    """Replay every game under one engine configuration and aggregate scores and costs."""
+    run_args = argparse.Namespace(**{**vars(args), **config})
+    rng = np.random.default_rng(args.seed)
+    scores, round_times, round_peaks = [], [], []
+
+    for game_idx, game in enumerate(games):
+        setup = game[0]
+        truth = np.array([role == "F" for role in setup["roles"]], dtype=float)
+        # peak memory is sampled on the first game only, tracemalloc would skew the timings
+        trace = game_idx == 0
+        results = replay_game(game, run_args, rng)
+        while True:
+            if trace:
+                tracemalloc.start()
+            start = time.perf_counter()
+            result = next(results, None)
+            elapsed = time.perf_counter() - start
+            if trace:
+                round_peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+            if result is None:
+                break
+            round_times.append(elapsed)
+            marginals = np.array(list(result["marginals"].values()))
+            scores.append(score_round(marginals, truth, setup["fascists"]))
+
+    scores = np.array(scores)
+    round_ms = np.array(round_times) * 1000
+    return {
+        **config,
+        "brier": float(scores[:, 0].mean()),
+        "log_loss": float(scores[:, 1].mean()),
+        "top_k_hit_rate": float(scores[:, 2].mean()),
+        "round_ms_mean": float(round_ms.mean()),
+        "round_ms_p95": float(np.percentile(round_ms, 95)),
+        "peak_kb_per_round": max(round_peaks) / 1024,
+    }
+
+
+def run_benchmark(args):
+    rng = np.random.default_rng(args.seed)
+    games = [
+        list(synthetic_game(g, int(rng.integers(5, 11)), args.bench_rounds, rng))
+        for g in range(args.bench_games)
+    ]
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "seed": args.seed,
+        "games": args.bench_games,
+        "rounds_per_game": args.bench_rounds,
+        "params": behavior_params(),
+        "results": [],
+    }
+    print(f"{'config':<34} {'brier':>7} {'logloss':>8} {'top-k':>6} {'ms/round':>9} {'peak KB':>9}")
+    for config in benchmark_configs(args):
+        result = benchmark_config(config, games, args)
+        report["results"].append(result)
+        label = " ".join(str(v) for v in config.values())
+        print(f"{label:<34} {result['brier']:>7.4f} {result['log_loss']:>8.4f} {result['top_k_hit_rate']:>6.3f} "
+              f"{result['round_ms_mean']:>9.3f} {result['peak_kb_per_round']:>9.1f}")
+
+    with open(args.benchmark, "w") as fp:
+        json.dump(report, fp, indent=2)
+    print(f"Saved {args.benchmark}")
+
+
+# ===== Inference service =====
+#
+# Newline-delimited JSON over TCP ("host:port") or a Unix socket ("unix:PATH").
+# Each request is an object with an "op":
+#   {"op": "create", "players": 7, "fascists": 3}        -> {"ok": true, "session": "..."}
+#   {"op": "update", "session": "...", <round record>}   -> {"ok": true, "result": {...}}
+#   {"op": "query", "session": "..."}                    -> {"ok": true, "marginals": {...}, ...}
+#   {"op": "close", "session": "..."}                    -> {"ok": true}
+# "create" accepts the replay setup fields plus an optional "session" id (one
+# not already in use) and "engine" (default "exact", a few KB per table). Sessions beyond
+# --max-sessions are evicted least-recently-used first, and sessions idle for
+# longer than --idle-timeout seconds are dropped.
+
+class SessionStore:
+    def __init__(self, args, max_sessions=512, idle_timeout=3600.0):
+        self.args = args
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = OrderedDict()  # id -> [InferenceSession, last_used]
+
+    def create(self, request):
+        engine = request.get("engine", "exact")
+        if not isinstance(engine, str):
+            raise ValueError(f"'engine' must be one of {', '.join(sorted(ENGINES))}")
+        session_args = argparse.Namespace(**{**vars(self.args), "engine": engine})
+        session_id = request.get("session") or uuid.uuid4().hex
+        if not isinstance(session_id, str):
+            raise ValueError(f"'session' must be a string, got {session_id!r}")
+        if session_id in self.sessions:
+            raise ValueError(f"session {session_id!r} already exists")
+        self.sessions[session_id] = [session_from_setup(request, session_args), time.monotonic()]
+        self.sessions.move_to_end(session_id)
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+        return session_id
+
+    def get(self, session_id):
+        if not isinstance(session_id, str) or session_id not in self.sessions:
+            raise ValueError(f"unknown session {session_id!r}")
+        entry = self.sessions[session_id]
+        entry[1] = time.monotonic()
+        self.sessions.move_to_end(session_id)
+        return entry[0]
+
+    def close(self, session_id):
+        self.sessions.pop(session_id, None)
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        # least recently used first, so stop at the first fresh session
+        while self.sessions and next(iter(self.sessions.values()))[1] < cutoff:
+            self.sessions.popitem(last=False)
+
+    def handle(self, request):
+        if not isinstance(request, dict):
+            raise ValueError(f"request must be a JSON object, got {type(request).__name__}")
+        op = request.get("op")
+        if op == "create":
+            return {"ok": True, "session": self.create(request)}
+        if op == "update":
+            session_id = request.get("session")
+            return {"ok": True, "result": play_record(self.get(session_id), request, session_id)}
+        if op == "query":
+            session = self.get(request.get("session"))
+            return {
+                "ok": True,
+                "round": session.round_num,
+                "marginals": {name: round(float(p), 6) for name, p in zip(session.players, session.marginals())},
+                "sus": {name: round(s, 6) for name, s in zip(session.players, session.suspicion())},
+                "deck": {"F": session.deck_F, "L": session.deck_L},
+            }
+        if op == "close":
+            session_id = request.get("session")
+            if not isinstance(session_id, str):
+                raise ValueError(f"'session' must be a string, got {session_id!r}")
+            self.close(session_id)
+            return {"ok": True}
+        raise ValueError(f"unknown op {op!r}")
+
+
+async def handle_client(reader, writer, store):
+    try:
+        while line := await reader.readline():
+            if not line.strip():
+                continue
+            try:
+                response = store.handle(json.loads(line))
+            except KeyError as e:
+                response = {"ok": False, "error": f"missing field {e.args[0]!r}"}
+            except (ValueError, TypeError, IndexError) as e:
+                response = {"ok": False, "error": str(e)}
+            except Exception as e:
+                # a bad request must never take the connection (or other sessions) down with it
+                response = {"ok": False, "error": f"internal error: {type(e).__name__}: {e}"}
+            writer.write((json.dumps(response) + "\n").encode())
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+async def evict_periodically(store, interval):
+    while True:
+        await asyncio.sleep(interval)
+        store.evict_idle()
+
+
+async def serve(args):
+    store = SessionStore(args, max_sessions=args.max_sessions, idle_timeout=args.idle_timeout)
+
+    def client_connected(reader, writer):
+        return handle_client(reader, writer, store)
+
+    if args.serve.startswith("unix:"):
+        server = await asyncio.start_unix_server(client_connected, path=args.serve[len("unix:"):])
+    else:
+        host, _, port = args.serve.rpartition(":")
+        server = await asyncio.start_server(client_connected, host or "127.0.0.1", int(port))
+    print(f"Serving inference sessions on {args.serve}")
+
+    eviction = asyncio.create_task(evict_periodically(store, min(60.0, args.idle_timeout)))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        eviction.cancel()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Secret Hitler inference assistant")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="particle",
+                        help="particle filter (Monte Carlo) or exact enumeration of all assignments")
+    parser.add_argument("--particles", type=int, default=10000, help="number of particles (default 10000)")
+    parser.add_argument("--resampler", choices=sorted(RESAMPLERS), default="systematic",
+                        help="particle resampling scheme (default systematic)")
+    parser.add_argument("--ess-threshold", type=float, default=0.5,
+                        help="resample once ESS falls below this fraction of the particles (default 0.5)")
+    parser.add_argument("--support-decay", type=float, default=1.0,
+                        help="per-round decay of support-graph edges (default 1.0, no decay)")
+    parser.add_argument("--seed", type=int, default=None, help="RNG seed for reproducible runs")
+    parser.add_argument("--replay", metavar="PATH",
+                        help="score games from a JSONL file ('-' for stdin) instead of prompting")
+    parser.add_argument("--output", metavar="PATH",
+                        help="where --replay/--calibrate write their results (default stdout)")
+    parser.add_argument("--calibrate", metavar="PATH",
+                        help="fit the behavior model to labelled games in a replay-format corpus")
+    parser.add_argument("--grid", metavar="NAME=V1,V2,...", action="append",
+                        help="values to sweep for one parameter during --calibrate (repeatable)")
+    parser.add_argument("--cache-dir", metavar="DIR", default=None,
+                        help="where --calibrate caches encoded corpora "
+                             "(default $XDG_CACHE_HOME/secret-hitler, '' disables)")
+    parser.add_argument("--workers", type=int, default=None, help="--calibrate process pool size (default: all cores)")
+    parser.add_argument("--params", metavar="PATH", help="load behavior model constants from a --calibrate result")
+    parser.add_argument("--benchmark", metavar="PATH",
+                        help="score engine configurations on synthetic games and save a JSON report")
+    parser.add_argument("--bench-games", type=int, default=200, help="synthetic games per benchmark (default 200)")
+    parser.add_argument("--bench-rounds", type=int, default=10, help="rounds per synthetic game (default 10)")
+    parser.add_argument("--bench-engines", default="exact,particle", help="comma-separated engines to benchmark")
+    parser.add_argument("--bench-particles", default="1000,10000,100000",
+                        help="comma-separated particle counts to benchmark")
+    parser.add_argument("--bench-resamplers", default="systematic",
+                        help="comma-separated resamplers to benchmark")
+    parser.add_argument("--serve", metavar="ADDRESS",
+                        help="run the multi-session JSON service on host:port or unix:PATH")
+    parser.add_argument("--max-sessions", type=int, default=512,
+                        help="sessions kept before least-recently-used eviction (default 512)")
+    parser.add_argument("--idle-timeout", type=float, default=3600.0,
+                        help="seconds before an idle session is evicted (default 3600)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.params:
+        load_params(args.params)
+    if args.calibrate:
+        run_calibration(args)
+        return
+    if args.benchmark:
+        run_benchmark(args)
+        return
+    if args.serve:
+        try:
+            asyncio.run(serve(args))
+        except KeyboardInterrupt:
+            pass
+        return
+    if args.replay:
+        run_replay(args)
+        return
+
     print("=== Secret Hitler Inference Assistant (Support-Aware) ===")
     n = int(input("Enter number of players (5–10): "))
     f = int(input("Enter number of fascists: "))
@@ -97,24 +1042,12 @@ def main():
     deck_L = int(input("Enter current number of Liberal cards in deck (default 6): ") or 6)
     print(f"Initial deck: {deck_F}F / {deck_L}L")
 
-    num_particles = 10000
-
-    # initial particles
-    particles = []
-    for _ in range(num_particles):
-        fascists = set(random.sample(range(n), f))
-        particles.append(tuple("F" if i in fascists else "L" for i in range(n)))
+    session = InferenceSession(players, make_engine(args, n, f), deck_F, deck_L, support_decay=args.support_decay)
+    engine = session.engine
 
-    # suspicion tracker
-    player_scores = defaultdict(lambda: {"sus": 0.0})
-
-    # support graph: supporter -> {supported: count}
-    support_graph = defaultdict(lambda: defaultdict(int))
-
-    round_num = 1
     while True:
-        print(f"\n--- Round {round_num} ---")
-        print(f"Deck before round: {deck_F}F / {deck_L}L remaining.")
+        print(f"\n--- Round {session.round_num} ---")
+        print(f"Deck before round: {session.deck_F}F / {session.deck_L}L remaining.")
         pres = input(f"President? ({'/'.join(players)}): ").strip().upper()
         chan = input(f"Chancellor? ({'/'.join(players)}): ").strip().upper()
         if pres not in players or chan not in players:
@@ -126,73 +1059,35 @@ def main():
         chan_got = input("What did Chancellor SAY they got? (e.g., 1F1L): ").strip().upper()
         enacted = input("What policy was ENACTED? (F/L): ").strip().upper()
 
-        pres_idx = players.index(pres)
-        chan_idx = players.index(chan)
-
-        obs = (pres_idx, chan_idx, pres_draw, pres_pass, chan_got, enacted)
-
-        # 1) weight update
-        weights = [likelihood_of_obs(obs, a, deck_F, deck_L, player_scores) for a in particles]
-        particles = resample_by_weights(particles, weights)
-        marginals = estimate_marginals(particles)
-
-        # 2) base suspicion update from round
-        mismatch = int(pres_pass[0]) != int(chan_got[0])
-        if mismatch:
-            player_scores[pres_idx]["sus"] += 1.0
-            player_scores[chan_idx]["sus"] += 1.0
-        if enacted == "F":
-            # chancellor involved in F tends to be a bit more sus
-            player_scores[chan_idx]["sus"] += 0.5
+        # 1-2) weight update and base suspicion
+        session.observe(pres, chan, pres_draw, pres_pass, chan_got, enacted)
+        marginals = session.marginals()
 
         # 3) ask for social support info
         # format: "A:E,B:D" means "A supported E", "B supported D"
         sup_line = input(
             "Who supported whom in discussion? (format A:E,B:D) leave blank if none: "
         ).strip()
-        if sup_line:
-            pairs = [p.strip() for p in sup_line.split(",") if p.strip()]
-            for pair in pairs:
-                if ":" in pair:
-                    src, dst = pair.split(":", 1)
-                    src = src.strip().upper()
-                    dst = dst.strip().upper()
-                    if src in players and dst in players:
-                        support_graph[src][dst] += 1
+        session.add_support(parse_support(sup_line))
 
         # 4) propagate suspicion via support graph
-        # if a suspicious player keeps defending someone, that someone becomes more suspicious
-        for src in players:
-            src_idx = players.index(src)
-            src_sus = player_scores[src_idx]["sus"]
-            if src_sus <= 0:
-                continue
-            for dst, count in support_graph[src].items():
-                dst_idx = players.index(dst)
-                # support weight: more repeats → stronger
-                player_scores[dst_idx]["sus"] += SOCIAL_INFLUENCE * src_sus * (count / (round_num))
+        session.propagate()
 
         # 5) print probs
         print("\nEstimated probability each player is a fascist:")
-        for i, p in enumerate(marginals):
-            print(f"  {players[i]}: {p * 100:.1f}%  (sus={player_scores[i]['sus']:.2f})")
-
-        if enacted == "F":
-            deck_F -= 1
-        else:
-            deck_L -= 1
+        for name, p, sus in zip(players, marginals, session.suspicion()):
+            print(f"  {name}: {p * 100:.1f}%  (sus={sus:.2f})")
+        if isinstance(engine, ParticleEngine):
+            print(f"Effective sample size: {engine.ess:.0f}/{len(engine.particles)}")
 
-            # reshuffle if deck too low
-        if deck_F + deck_L < 3:
+        if session.end_round(enacted):
             print("Deck low → reshuffle to 11F + 6L")
-            deck_F, deck_L = 11, 6
 
-        print(f"Deck after round: {deck_F}F / {deck_L}L")
+        print(f"Deck after round: {session.deck_F}F / {session.deck_L}L")
 
         cont = input("Continue? (y/n): ").strip().lower()
         if cont != "y":
             break
-        round_num += 1
 
 
 if __name__ == "__main__":
@@ -10,8 +10,7 @@ from typing import List, Dict, Optional, Tuple
 from pydantic import BaseModel, Field
 from openai import OpenAI
 
-MOODEL = "gpt-5-mini"  # works well for conversational play
-client = OpenAI(api_key=OPENAI_API_KEY)
+MODEL = "gpt-5-mini"  # works well for conversational play
 
 # !/usr/bin/env python3
 """
@@ -19,10 +18,28 @@ Secret Hitler - Natural Discussion Edition
 AI players speak organically throughout the game like real humans
 """
 
+import argparse
+import bisect
+import gzip
+import hashlib
+import heapq
+import importlib.util
+import json
+import math
+import os
 import random
+import re
+import sqlite3
+import sys
+import threading
 import time
-from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Tuple
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+from typing import Iterator, List, Dict, Optional, Tuple
+import numpy as np
 from pydantic import BaseModel, Field
 from openai import OpenAI
 #
@@ -80,6 +97,24 @@ BOARD_CONFIGS = {
 
 VETO_THRESHOLD = 5
 
+# Upper bound on simultaneous LLM requests
+MAX_CONCURRENT_CALLS = 10
+
+# Prompt budget (estimated tokens) for chat summary + recent lines
+CHAT_TOKEN_BUDGET = 400
+# Chat lines kept verbatim before they're folded into the summary
+RECENT_CHAT_LINES = 8
+
+# Where the console game snapshots itself at each phase boundary
+CHECKPOINT_PATH = "secret_hitler.ckpt"
+
+# Player memory: how many are kept, how fast they fade per round, how many reach a prompt
+MEMORY_CAPACITY = 30
+MEMORY_DECAY = 0.8
+MEMORY_TOP_K = 5
+# Weight multiplier for memories that name someone the current prompt is about
+MEMORY_RELEVANCE_BOOST = 2.0
+
 
 # ================== PERSONALITY SYSTEM ==================
 class Personality:
@@ -116,27 +151,151 @@ class AIComment(BaseModel):
     emotional_state: Optional[str] = None
 
 
+# ================== BELIEFS ==================
+#
+# Each AI seat that doesn't already know the teams keeps its own posterior
+# over who is on the fascist team, using the behaviour model of
+# secret-hitler-prediction.py (loaded from beside this file - without it,
+# players simply go without beliefs).
+
+def _load_predictor():
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "secret-hitler-prediction.py")
+    if not os.path.exists(path):
+        return None
+    spec = importlib.util.spec_from_file_location("secret_hitler_prediction", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+predictor = _load_predictor()
+
+# P(Ja) for a voter: fascists back governments with a fascist in them, liberals vote blind
+VOTE_MODEL = {"liberal_ja": 0.6, "fascist_ja_ally": 0.9, "fascist_ja": 0.5}
+# Suspects listed in prompts
+BELIEF_TOP_K = 3
+
+
+class Belief:
+    """One player's posterior over fascist-team assignments (Hitler counts as fascist)"""
+
+    def __init__(self, me: str, order: List[str], fascists: int, my_role: str):
+        self.me = me
+        self.players = list(order)
+        self.index = {name: i for i, name in enumerate(order)}
+        self.engine = predictor.ExactEngine(len(order), fascists)
+        self.condition(me, my_role != "L")
+
+    def _bits(self, name: str) -> np.ndarray:
+        return predictor.role_bits(self.engine.assignments, self.index[name])
+
+    def _update(self, log_like: np.ndarray):
+        log_probs = self.engine.log_probs + log_like
+        if log_probs.max() == -np.inf:
+            return  # impossible under every assignment, keep the current posterior
+        self.engine.log_probs = predictor.normalize_log_weights(log_probs)
+
+    def condition(self, name: str, fascist: bool):
+        """Certain knowledge: our own role, an investigation result"""
+        with np.errstate(divide="ignore"):
+            self._update(np.log((self._bits(name) == fascist).astype(float)))
+
+    def observe_policy(self, president: str, chancellor: str, enacted_F: bool):
+        """A government's enactment, claims unseen: summing the predictor's table over
+        both claim outcomes leaves just its enactment likelihood"""
+        params = predictor.behavior_params()
+        table = predictor.behavior_table(False, enacted_F, params) + predictor.behavior_table(True, enacted_F, params)
+        self._update(np.log(table)[self._bits(president).astype(int), self._bits(chancellor).astype(int)])
+
+    def observe_votes(self, president: str, chancellor: str, votes: Dict[str, bool]):
+        has_fascist = self._bits(president) | self._bits(chancellor)
+        ally_ja = np.where(has_fascist, VOTE_MODEL["fascist_ja_ally"], VOTE_MODEL["fascist_ja"])
+        log_like = np.zeros(len(self.engine.assignments))
+        for voter, ja in votes.items():
+            if voter == self.me or voter not in self.index:
+                continue
+            p_ja = np.where(self._bits(voter), ally_ja, VOTE_MODEL["liberal_ja"])
+            log_like += np.log(p_ja if ja else 1 - p_ja)
+        self._update(log_like)
+
+    def suspicion(self) -> Dict[str, float]:
+        """P(fascist team) for everyone but us"""
+        marginals = self.engine.marginals()
+        return {name: float(marginals[i]) for i, name in enumerate(self.players) if name != self.me}
+
+    def top_suspects(self, alive: Optional[List[str]] = None, k: int = BELIEF_TOP_K) -> str:
+        ranked = sorted(((p, name) for name, p in self.suspicion().items() if alive is None or name in alive),
+                        reverse=True)[:k]
+        return ", ".join(f"{name} {p:.0%}" for p, name in ranked)
+
+
 # ================== GAME MODELS ==================
+def name_words(text: str) -> set:
+    """Upper-cased whole words of `text`, for matching player names without hitting substrings"""
+    return set(re.findall(r"[A-Za-z]+", text.upper()))
+
+
+class MemoryStore:
+    """Bounded min-heap of memories weighted by importance * decay ** age.
+
+    An entry's weight relative to any other never changes as time passes
+    (both decay by the same factor), so the heap can be keyed once on
+    insertion by log(importance) - when * log(decay) and the weakest entry
+    is always at the root: adding is O(log n) and eviction pops the root.
+    """
+
+    def __init__(self, capacity: int = MEMORY_CAPACITY, decay: float = MEMORY_DECAY):
+        self.capacity = capacity
+        self.decay = decay
+        self.heap: List[Tuple[float, int, str, int, int]] = []  # (key, seq, event, importance, when)
+        self.seq = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def add(self, event: str, importance: int = 1, when: int = 0):
+        entry = (math.log(importance) - when * math.log(self.decay), self.seq, event, importance, when)
+        self.seq += 1
+        if len(self.heap) < self.capacity:
+            heapq.heappush(self.heap, entry)
+        elif entry > self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+
+    def top(self, k: int, now: int, about: Tuple[str, ...] = ()) -> List[str]:
+        """The k memories weighing most at `now`, boosted when they name anyone in `about`"""
+        about = set(about)
+
+        def weight(entry):
+            _, _, event, importance, when = entry
+            w = importance * self.decay ** (now - when)
+            if about & name_words(event):
+                w *= MEMORY_RELEVANCE_BOOST
+            return w
+        return [entry[2] for entry in heapq.nlargest(k, self.heap, key=weight)]
+
+
 @dataclass
 class Player:
     name: str
     role: str  # "L", "F", or "H"
     personality: Dict
-    memory: List[Tuple[str, int]] = field(default_factory=list)
+    memory: MemoryStore = field(default_factory=MemoryStore)
     investigated_players: Dict[str, str] = field(default_factory=dict)
-    suspicion_scores: Dict[str, float] = field(default_factory=dict)
     alive: bool = True
     term_limited: bool = False
     last_spoke: int = 0  # Track when they last spoke
+    teammates: List[str] = field(default_factory=list)  # Fixed at deal time
+    known_hitler: Optional[str] = None  # Only set for fascists
+    prompt_prefix: str = ""  # Static prompt segment, see compile_prompt_prefix
+    belief: Optional[Belief] = None  # Posterior over the fascist team, for seats that don't know it
 
-    def remember(self, event: str, importance: int = 1):
-        self.memory.append((event, importance))
-        self.memory = sorted(self.memory, key=lambda x: -x[1])[:30]
+    def remember(self, event: str, importance: int = 1, when: int = 0):
+        self.memory.add(event, importance, when)
 
-    def update_suspicion(self, target: str, delta: float):
-        if target not in self.suspicion_scores:
-            self.suspicion_scores[target] = 5.0
-        self.suspicion_scores[target] = max(0, min(10, self.suspicion_scores[target] + delta))
+    def recall(self, now: int, about: Tuple[str, ...] = ()) -> str:
+        """Prompt lines for the memories that matter most right now"""
+        memories = self.memory.top(MEMORY_TOP_K, now, about)
+        return "\n".join(f"- {m}" for m in memories)
 
     def visible_teammates(self, all_players: Dict[str, 'Player'], player_count: int) -> List[str]:
         config = BOARD_CONFIGS[player_count]
@@ -148,6 +307,146 @@ class Player:
         return []
 
 
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+@dataclass
+class ChatSummary:
+    """Running digest of chat that has scrolled out of the prompt window"""
+    lines: int = 0
+    spoken: Dict[str, int] = field(default_factory=dict)
+    mentions: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    last_said: Dict[str, str] = field(default_factory=dict)
+
+    def fold(self, entries: List['LogEntry'], names: List[str]):
+        for entry in entries:
+            speaker, message = entry.actors[0], entry.data["text"]
+            self.lines += 1
+            self.spoken[speaker] = self.spoken.get(speaker, 0) + 1
+            words = set(re.findall(r"[A-Za-z]+", message.upper()))
+            for name in names:
+                if name != speaker and name in words:
+                    counts = self.mentions.setdefault(speaker, {})
+                    counts[name] = counts.get(name, 0) + 1
+            self.last_said[speaker] = " ".join(message.split()[:12])
+
+    def render(self, max_tokens: int) -> str:
+        if not self.lines:
+            return ""
+        text = f"Earlier ({self.lines} lines):"
+        for speaker, count in sorted(self.spoken.items(), key=lambda kv: -kv[1]):
+            about = sorted(self.mentions.get(speaker, {}).items(), key=lambda kv: -kv[1])[:3]
+            part = f" {speaker} x{count}"
+            if about:
+                part += " on " + ",".join(f"{name}x{n}" for name, n in about)
+            part += f' "{self.last_said[speaker]}";'
+            if estimate_tokens(text + part) > max_tokens:
+                break
+            text += part
+        return text
+
+
+@dataclass(frozen=True)
+class LogEntry:
+    """One thing that happened at the table"""
+    seq: int
+    round: int
+    phase: str  # setup, nomination, election, legislative, executive
+    kind: str  # chat, vote, government, policy, veto, investigation, special_election, execution
+    actors: Tuple[str, ...] = ()  # who did it first, then who it was done to
+    data: Dict = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        return {"seq": self.seq, "round": self.round, "phase": self.phase,
+                "kind": self.kind, "actors": self.actors, "data": self.data}
+
+    def describe(self) -> str:
+        a, d = self.actors, self.data
+        if self.kind == "chat":
+            return f"{a[0]}: {d['text']}"
+        if self.kind == "vote":
+            return f"{a[0]} voted {'Ja' if d['ja'] else 'Nein'} on {d['government'][0]}+{d['government'][1]}"
+        if self.kind == "government":
+            return f"{a[0]}+{a[1]} elected"
+        if self.kind == "policy":
+            name = "Liberal" if d["policy"] == "L" else "Fascist"
+            return f"{name} enacted by chaos" if a[0] == "CHAOS" else f"{a[0]}+{a[1]} enacted {name}"
+        if self.kind == "veto":
+            return f"{a[0]}+{a[1]} veto {'approved' if d['approved'] else 'rejected'}"
+        if self.kind == "investigation":
+            return f"{a[0]} investigated {a[1]}"
+        if self.kind == "special_election":
+            return f"{a[0]} chose {a[1]} as next President"
+        if self.kind == "execution":
+            return f"{a[0]} executed {a[1]}"
+        return f"{self.kind} {' '.join(a)} {d}"
+
+
+class EventLog:
+    """Append-only game record indexed by player, phase and kind.
+
+    Index deques hold the same entry objects as the main one, so queries
+    walk the narrowest index instead of copying anything. With `maxlen`
+    the log is a ring buffer and the oldest entry leaves every index.
+    """
+
+    def __init__(self, maxlen: Optional[int] = None):
+        self.entries: deque = deque(maxlen=maxlen)
+        self.by_player: Dict[str, deque] = defaultdict(deque)
+        self.by_phase: Dict[str, deque] = defaultdict(deque)
+        self.by_kind: Dict[str, deque] = defaultdict(deque)
+        self.seq = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self) -> Iterator[LogEntry]:
+        return iter(self.entries)
+
+    def append(self, round: int, phase: str, kind: str, actors: Tuple[str, ...] = (), **data) -> LogEntry:
+        if self.entries.maxlen is not None and len(self.entries) == self.entries.maxlen:
+            old = self.entries[0]  # appended before everything else, so leftmost in its indexes too
+            for index in self._indexes_of(old):
+                index.popleft()
+        entry = LogEntry(self.seq, round, phase, kind, tuple(actors), data)
+        self.seq += 1
+        self.entries.append(entry)
+        for index in self._indexes_of(entry):
+            index.append(entry)
+        return entry
+
+    def _indexes_of(self, entry: LogEntry) -> List[deque]:
+        indexes = [self.by_kind[entry.kind], self.by_phase[entry.phase]]
+        indexes += [self.by_player[name] for name in dict.fromkeys(entry.actors)]
+        return indexes
+
+    def query(self, kind: Optional[str] = None, player: Optional[str] = None,
+              phase: Optional[str] = None, newest_first: bool = False) -> Iterator[LogEntry]:
+        """Entries matching every given filter, oldest first unless `newest_first`"""
+        indexes = [index.get(key, ()) for index, key in
+                   ((self.by_kind, kind), (self.by_player, player), (self.by_phase, phase)) if key is not None]
+        source = min(indexes, key=len) if indexes else self.entries
+        for entry in (reversed(source) if newest_first else source):
+            if ((kind is None or entry.kind == kind) and (phase is None or entry.phase == phase)
+                    and (player is None or player in entry.actors)):
+                yield entry
+
+    def last(self, n: int, **filters) -> List[LogEntry]:
+        """The n most recent matching entries, oldest first"""
+        return list(islice(self.query(newest_first=True, **filters), n))[::-1]
+
+    def count(self, kind: str) -> int:
+        return len(self.by_kind.get(kind, ()))
+
+    def dump(self, path: str):
+        """Write the log as JSON lines"""
+        with open(path, "w") as f:
+            for entry in self.entries:
+                f.write(json.dumps(entry.to_dict()) + "\n")
+
+
 @dataclass
 class Table:
     players: Dict[str, Player]
@@ -163,11 +462,12 @@ class Table:
     last_government: Optional[Tuple[str, str]] = None
     failed_elections: int = 0
     round_num: int = 1
-    governments_formed: List[Tuple[str, str]] = field(default_factory=list)
-    policy_history: List[Dict] = field(default_factory=list)
-    investigation_history: List[Tuple[str, str, str]] = field(default_factory=list)
-    execution_history: List[str] = field(default_factory=list)
-    chat_history: List[str] = field(default_factory=list)
+    phase: str = "setup"
+    log: EventLog = field(default_factory=EventLog)  # Everything that happened, see record()
+    chat_folded: int = 0  # Chat lines already folded into chat_summary
+    chat_summary: ChatSummary = field(default_factory=ChatSummary)
+    chat_token_budget: int = CHAT_TOKEN_BUDGET
+    token_usage: List[Tuple[str, str, int, int]] = field(default_factory=list)  # (player, call, prompt, completion)
     veto_enabled: bool = False
     interaction_count: int = 0  # Track total interactions for speaking frequency
 
@@ -186,7 +486,6 @@ class Table:
         return drawn
 
     def reshuffle(self):
-        print(f"♻️ Reshuffling {len(self.discards)} cards...")
         self.deck.extend(self.discards)
         self.discards.clear()
         random.shuffle(self.deck)
@@ -213,18 +512,11 @@ class Table:
     def enact_policy(self, policy: str, president: str, chancellor: str):
         if policy == "L":
             self.liberal_policies += 1
-            print(f"📘 LIBERAL policy enacted! ({self.liberal_policies}/5)")
         else:
             self.fascist_policies += 1
-            print(f"📕 FASCIST policy enacted! ({self.fascist_policies}/6)")
             self.check_veto_enabled()
 
-        self.policy_history.append({
-            "round": self.round_num,
-            "president": president,
-            "chancellor": chancellor,
-            "policy": policy
-        })
+        self.record("policy", president, chancellor, policy=policy)
 
     def check_win_conditions(self) -> Optional[str]:
         if self.liberal_policies >= self.config["win_liberal"]:
@@ -235,490 +527,2007 @@ class Table:
             chancellor = self.last_government[1]
             if chancellor in self.players and self.players[chancellor].role == "H":
                 return "HITLER_CHANCELLOR"
-        for name in self.execution_history:
-            if name in self.players and self.players[name].role == "H":
+        for entry in self.log.query(kind="execution"):
+            if self.players[entry.actors[1]].role == "H":
                 return "HITLER_EXECUTED"
         return None
 
     def get_current_power(self) -> Optional[str]:
         return self.config.get("powers", {}).get(self.fascist_policies)
 
+    def record(self, kind: str, *actors: str, **data) -> LogEntry:
+        return self.log.append(self.round_num, self.phase, kind, actors, **data)
+
     def add_chat(self, speaker: str, message: str):
-        entry = f"{speaker}: {message}"
-        self.chat_history.append(entry)
-        self.chat_history = self.chat_history[-100:]
-        print(f"  {entry}")
+        self.record("chat", speaker, text=message)
+
+    def refresh_chat_summary(self):
+        """Fold chat older than the recent window into the running summary - once per phase"""
+        to_fold = self.log.count("chat") - self.chat_folded - RECENT_CHAT_LINES
+        if to_fold <= 0:
+            return
+        chat = self.log.query(kind="chat")
+        self.chat_summary.fold(list(islice(chat, self.chat_folded, self.chat_folded + to_fold)), list(self.players))
+        self.chat_folded += to_fold
+
+    def chat_context(self) -> str:
+        """Summary plus as many recent lines as fit in the token budget"""
+        summary = self.chat_summary.render(self.chat_token_budget // 2)
+        remaining = self.chat_token_budget - (estimate_tokens(summary) if summary else 0)
+        unfolded = self.log.count("chat") - self.chat_folded
+        window = []
+        for entry in islice(self.log.query(kind="chat", newest_first=True), unfolded):
+            line = entry.describe()
+            cost = estimate_tokens(line)
+            if cost > remaining:
+                break
+            window.append(line)
+            remaining -= cost
+        return "\n".join(([summary] if summary else []) + window[::-1])
 
+    def recent_record(self, n: int = 3) -> str:
+        """The last few governments' outcomes for prompts"""
+        return "; ".join(entry.describe() for entry in self.log.last(n, kind="policy")) or "none yet"
 
-# ================== NATURAL AI SYSTEM ==================
+    def record_tokens(self, player: str, call: str, completion: 'Completion'):
+        self.token_usage.append((player, call, completion.prompt_tokens, completion.completion_tokens))
 
-def get_ai_comment(player: Player, table: Table, context: str) -> Optional[str]:
-    """Get natural AI commentary based on game situation"""
 
-    # Build comprehensive context
-    teammates = player.visible_teammates(table.players, table.player_count)
-    hitler = next((p.name for p in table.players.values() if p.role == "H"), None) if player.role == "F" else None
+# ================== CONCURRENCY ==================
 
-    # Recent events context
-    recent_chat = "\n".join(table.chat_history[-20:]) if table.chat_history else ""
-    recent_policies = table.policy_history[-3:] if table.policy_history else []
+_executor: Optional[ThreadPoolExecutor] = None
 
-    # Check if player should speak (based on personality and situation)
-    rounds_since_spoke = table.interaction_count - player.last_spoke
 
-    prompt = f"""You are {player.name}, a {player.personality['occupation']} playing Secret Hitler.
-Your personality trait: {player.personality['trait']}
-Your SECRET role: {'Liberal' if player.role == 'L' else 'Fascist' if player.role == 'F' else 'Hitler'}
-{'Your fascist teammates: ' + ', '.join(teammates) if teammates else ''}
-{'Hitler is: ' + hitler if hitler and player.role == 'F' else ''}
+def get_executor() -> ThreadPoolExecutor:
+    """Shared pool for blocking LLM calls"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_CALLS, thread_name_prefix="llm")
+    return _executor
 
-Current situation: {context}
-Board state: L:{table.liberal_policies}/5 F:{table.fascist_policies}/6 Failed:{table.failed_elections}/3
-You last spoke {rounds_since_spoke} interactions ago.
 
-Recent conversation:
-{recent_chat}
+def fan_out(fn, calls: List[tuple]) -> List:
+    """Run fn(*args) for every args tuple at once, results in the same order as calls"""
+    futures = [get_executor().submit(fn, *args) for args in calls]
+    return [f.result() for f in futures]
+
+
+# ================== METRICS ==================
+
+# Which game phase each backend call belongs to
+PHASE_OF_ACTION = {
+    "nominate": "nomination", "vote": "vote", "discard": "discard", "enact": "enact",
+    "veto_response": "veto", "investigate": "power", "special_election": "power", "execute": "power",
+}
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000)
+
+
+def call_phase(meta: Dict) -> str:
+    if meta.get("call") == "comment":
+        return "discussion"
+    return PHASE_OF_ACTION.get(meta.get("action"), "other")
+
+
+class Metrics:
+    """Thread-safe labelled counters and cumulative histograms.
+
+    Series are keyed by (name, sorted label pairs); `to_json()` and
+    `to_prometheus()` render the same snapshot.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[Tuple, float] = defaultdict(float)
+        self.histograms: Dict[Tuple, Dict] = {}
+        self.bounds: Dict[str, Tuple] = {}
+
+    @staticmethod
+    def _key(name: str, labels: Dict) -> Tuple:
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        with self.lock:
+            self.counters[self._key(name, labels)] += value
+
+    def observe(self, name: str, value: float, buckets: Tuple, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                self.bounds[name] = buckets
+                hist = self.histograms[key] = {"counts": [0] * (len(buckets) + 1), "sum": 0.0, "count": 0}
+            hist["counts"][bisect.bisect_left(buckets, value)] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def to_json(self) -> Dict:
+        with self.lock:
+            return {
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in sorted(self.counters.items())],
+                "histograms": [{"name": name, "labels": dict(labels), "buckets": list(self.bounds[name]),
+                                "counts": list(h["counts"]), "sum": h["sum"], "count": h["count"]}
+                               for (name, labels), h in sorted(self.histograms.items())],
+            }
+
+    def to_prometheus(self) -> str:
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}" if pairs else ""
+
+        lines = []
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(f"{name}{fmt(labels)} {value:g}")
+            for (name, labels), h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(list(self.bounds[name]) + ["+Inf"], h["counts"]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{fmt(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{fmt(labels)} {h['sum']:g}")
+                lines.append(f"{name}_count{fmt(labels)} {h['count']}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str):
+        """Prometheus text for *.prom, JSON otherwise; written atomically"""
+        text = self.to_prometheus() if path.endswith(".prom") else json.dumps(self.to_json(), indent=2)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+
+# Seconds spent blocked on the human in ask(); step timings leave this out
+_input_wait = 0.0
+
+
+@contextmanager
+def step_timer(phase: str):
+    """Record game_step_seconds for the block, minus any time spent waiting for human input.
+
+    Yields the label dict, so the block can retag the step once it knows more.
+    """
+    labels = {"phase": phase}
+    start, waited = time.perf_counter(), _input_wait
+    try:
+        yield labels
+    finally:
+        elapsed = time.perf_counter() - start - (_input_wait - waited)
+        _metrics.observe("game_step_seconds", elapsed, LATENCY_BUCKETS, **labels)
+
+
+def dump_metrics_every(path: str, interval: float) -> threading.Event:
+    """Rewrite the metrics file every `interval` seconds until the returned event is set"""
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            _metrics.dump(path)
+
+    threading.Thread(target=loop, daemon=True).start()
+    return stop
+
+
+# ================== LLM BACKENDS ==================
+
+@dataclass
+class Completion:
+    """A parsed structured response plus what it cost"""
+    parsed: BaseModel
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class Backend:
+    """Source of structured completions.
+
+    `meta` carries the game facts behind a request (call type, action,
+    player, role, allies, legal options, ...) for backends that don't read
+    the prompt text.
+    """
+
+    def complete(self, messages: List[Dict], response_format: type, meta: Dict) -> Completion:
+        raise NotImplementedError
+
+
+class OpenAIBackend(Backend):
+    """The real thing - reads OPENAI_API_KEY from the environment"""
+
+    def __init__(self, model: str = MODEL):
+        self.model = model
+        self.client = OpenAI()
+
+    def complete(self, messages: List[Dict], response_format: type, meta: Dict) -> Completion:
+        response = self.client.beta.chat.completions.parse(
+            model=self.model,
+            messages=messages,
+            response_format=response_format
+        )
+        usage = response.usage
+        return Completion(
+            parsed=response.choices[0].message.parsed,
+            prompt_tokens=usage.prompt_tokens if usage else 0,
+            completion_tokens=usage.completion_tokens if usage else 0
+        )
+
+
+class FakeBackend(Backend):
+    """Offline stand-in that answers with schema-valid, rule-aware choices.
+
+    Latency is lognormal around `latency` seconds (`jitter` is the log-space
+    sigma); `error_rate` of calls raise, and calls slower than `timeout`
+    raise TimeoutError after waiting `timeout` seconds.
+    """
+
+    CHATTER = [
+        "I'm watching that government closely.",
+        "Honestly that vote tells me a lot.",
+        "Not sure I buy that claim.",
+        "Let's see how this plays out.",
+        "That's exactly what a fascist would say.",
+    ]
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.5, error_rate: float = 0.0,
+                 timeout: Optional[float] = None, speak_rate: float = 0.3, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout = timeout
+        self.speak_rate = speak_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def reseed(self, seed):
+        with self.lock:
+            self.rng.seed(seed)
+
+    def complete(self, messages: List[Dict], response_format: type, meta: Dict) -> Completion:
+        with self.lock:
+            delay = self.latency * self.rng.lognormvariate(0, self.jitter) if self.latency else 0.0
+            fails = self.rng.random() < self.error_rate
+            if response_format is AIComment:
+                fields = self._comment()
+            else:
+                fields = self._decide(meta)
+
+        if self.timeout is not None and delay > self.timeout:
+            time.sleep(self.timeout)
+            raise TimeoutError(f"fake backend timed out after {self.timeout:.2f}s")
+        if delay:
+            time.sleep(delay)
+        if fails:
+            raise RuntimeError("fake backend error")
+
+        prompt_chars = sum(len(m["content"]) for m in messages)
+        return Completion(
+            parsed=response_format.model_validate(fields),
+            prompt_tokens=prompt_chars // 4,
+            completion_tokens=len(str(fields)) // 4
+        )
+
+    def _comment(self) -> Dict:
+        speaks = self.rng.random() < self.speak_rate
+        return {"text": self.rng.choice(self.CHATTER) if speaks else "", "wants_to_speak": speaks}
+
+    def _decide(self, meta: Dict) -> Dict:
+        rng = self.rng
+        action = meta["action"]
+        options = meta.get("options") or []
+        fascist = meta["role"] in ("F", "H")
+        allies = set(meta.get("allies", []))
+        suspicion = meta.get("suspicion") or {}
+        fields = {"action": action}
+
+        if action == "vote":
+            government = set(meta.get("government") or ())
+            if fascist and government & (allies | {meta["player"]}):
+                ja = True
+            elif not fascist and suspicion:
+                # Liberals with a read turn down governments they suspect
+                ja = max(suspicion.get(name, 0.0) for name in government) < 0.5
+            else:
+                ja = rng.random() < (0.5 if fascist else 0.7)
+            fields["choice"] = "Ja" if ja else "Nein"
+        elif action == "discard":
+            # Bury the other team's card when there is one
+            bury = "L" if fascist else "F"
+            fields["discard_index"] = options.index(bury) if bury in options else rng.randrange(len(options))
+        elif action == "enact":
+            if not fascist and meta.get("can_veto") and "L" not in options:
+                fields["veto"] = True
+            want = "F" if fascist and rng.random() < 0.7 else "L"
+            fields["enact_index"] = options.index(want) if want in options else 0
+        elif action == "veto_response":
+            fields["veto"] = (not fascist) and rng.random() < 0.5
+        elif options:
+            # Nominations and powers: fascists favour allies for office, avoid them as targets
+            friendly = [o for o in options if o in allies]
+            hostile = [o for o in options if o not in allies] or options
+            pool = friendly if action in ("nominate", "special_election") and fascist and friendly else hostile
+            if not fascist and suspicion:
+                # Liberals trust the least suspicious and go after the most
+                trust = action in ("nominate", "special_election")
+                fields["target"] = (min if trust else max)(pool, key=lambda o: suspicion.get(o, 0.5))
+            else:
+                fields["target"] = rng.choice(pool)
+        return fields
+
+
+class CachingBackend(Backend):
+    """Disk-backed (SQLite) response cache in front of another backend.
+
+    Keys are a hash of the model, the whitespace-normalized messages and the
+    response schema. Entries expire after `ttl` seconds; beyond `max_bytes`
+    the least recently used are evicted. With `deterministic_only` only the
+    mechanical DETERMINISTIC_ACTIONS are cached, never table talk.
+    """
+
+    DETERMINISTIC_ACTIONS = ("vote", "discard", "enact", "veto_response")
+
+    def __init__(self, inner: Backend, path: str, ttl: Optional[float] = None,
+                 max_bytes: int = 64 * 1024 * 1024, deterministic_only: bool = False):
+        self.inner = inner
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.deterministic_only = deterministic_only
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "bypassed": 0}
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,
+            created REAL NOT NULL, last_used REAL NOT NULL)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.db.commit()
+
+    def cache_key(self, messages: List[Dict], response_format: type) -> str:
+        return request_key(messages, response_format, getattr(self.inner, "model", type(self.inner).__name__))
+
+    def cacheable(self, meta: Dict) -> bool:
+        if not self.deterministic_only:
+            return True
+        return meta.get("call") == "decide" and meta.get("action") in self.DETERMINISTIC_ACTIONS
+
+    def complete(self, messages: List[Dict], response_format: type, meta: Dict) -> Completion:
+        if not self.cacheable(meta):
+            with self.lock:
+                self.stats["bypassed"] += 1
+            return self.inner.complete(messages, response_format, meta)
+
+        key = self.cache_key(messages, response_format)
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and self.ttl is not None and now - row[1] > self.ttl:
+                self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.db.commit()
+                self.stats["evictions"] += 1
+                row = None
+            if row:
+                self.db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self.db.commit()
+                self.stats["hits"] += 1
+                return Completion(parsed=response_format.model_validate_json(row[0]))
+            self.stats["misses"] += 1
+
+        completion = self.inner.complete(messages, response_format, meta)
+
+        value = completion.parsed.model_dump_json()
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                            (key, value, len(value), now, now))
+            self.stats["stores"] += 1
+            self._evict()
+            self.db.commit()
+        return completion
+
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.db.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.stats["evictions"] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        self.db.close()
+
+
+class InstrumentedBackend(Backend):
+    """Times every call through another backend and counts its tokens and failures,
+    tagged by game phase and player"""
 
-Decide if you want to comment on the current situation. If you do, speak naturally as if playing with friends.
+    def __init__(self, inner: Backend, metrics: Optional[Metrics] = None):
+        self.inner = inner
+        self.metrics = metrics or get_metrics()
+
+    def complete(self, messages: List[Dict], response_format: type, meta: Dict) -> Completion:
+        labels = {"phase": call_phase(meta), "player": meta.get("player", "")}
+        start = time.perf_counter()
+        try:
+            completion = self.inner.complete(messages, response_format, meta)
+        except Exception as e:
+            self.metrics.observe("llm_latency_seconds", time.perf_counter() - start, LATENCY_BUCKETS,
+                                 phase=labels["phase"])
+            self.metrics.inc("llm_calls_total", outcome=type(e).__name__, **labels)
+            raise
+        self.metrics.observe("llm_latency_seconds", time.perf_counter() - start, LATENCY_BUCKETS,
+                             phase=labels["phase"])
+        self.metrics.observe("llm_prompt_tokens", completion.prompt_tokens, TOKEN_BUCKETS, phase=labels["phase"])
+        self.metrics.inc("llm_calls_total", outcome="ok", **labels)
+        self.metrics.inc("llm_prompt_tokens_total", completion.prompt_tokens, **labels)
+        self.metrics.inc("llm_completion_tokens_total", completion.completion_tokens, **labels)
+        return completion
+
+
+def find_backend(kind: type) -> Optional[Backend]:
+    """The first backend of type `kind` in the wrapper chain"""
+    backend = get_backend()
+    while backend is not None and not isinstance(backend, kind):
+        backend = getattr(backend, "inner", None)
+    return backend
+
+
+_backend: Optional[Backend] = None
+
+
+def get_backend() -> Backend:
+    global _backend
+    if _backend is None:
+        _backend = OpenAIBackend()
+    return _backend
+
+
+def set_backend(backend: Backend):
+    global _backend
+    _backend = backend
+
+
+# ================== RECORD / REPLAY ==================
+
+def request_key(messages: List[Dict], response_format: type, model: str = "") -> str:
+    """Stable hash of a request, insensitive to whitespace differences"""
+    payload = json.dumps({
+        "model": model,
+        "messages": [{"role": m["role"], "content": " ".join(m["content"].split())} for m in messages],
+        "schema": response_format.model_json_schema(),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class Cassette:
+    """Everything nondeterministic about a session, in a gzipped JSONL file.
+
+    The header holds the RNG seed; each later line is a backend exchange
+    (request, key, response or error) or a line the human typed. Replayed
+    responses are matched by request key, so the order concurrent calls
+    finish in doesn't matter.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str, mode: str, seed: Optional[int] = None):
+        self.path = path
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.misses = 0
+        if mode == "record":
+            self.seed = seed if seed is not None else random.randrange(2 ** 32)
+            self.fp = gzip.open(path, "wt", encoding="utf-8")
+            self._write({"version": self.VERSION, "seed": self.seed})
+        else:
+            self.responses: Dict[str, deque] = defaultdict(deque)
+            self.inputs: deque = deque()
+            with gzip.open(path, "rt", encoding="utf-8") as fp:
+                header = json.loads(fp.readline())
+                if header.get("version") != self.VERSION:
+                    raise ValueError(f"Unsupported cassette version {header.get('version')}")
+                self.seed = header["seed"]
+                try:
+                    for line in fp:
+                        entry = json.loads(line)
+                        if entry["t"] == "llm":
+                            self.responses[entry["key"]].append(entry)
+                        else:
+                            self.inputs.append(entry["text"])
+                except (EOFError, json.JSONDecodeError):
+                    pass  # cassette from a crashed game, keep what was flushed
+
+    def _write(self, entry: Dict):
+        with self.lock:
+            self.fp.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self.fp.flush()
+
+    def record_exchange(self, messages: List[Dict], key: str, meta: Dict,
+                        completion: Optional[Completion] = None, error: Optional[Exception] = None):
+        entry = {"t": "llm", "key": key, "meta": {k: meta.get(k) for k in ("call", "action", "player")},
+                 "messages": messages}
+        if completion is not None:
+            entry.update(resp=completion.parsed.model_dump_json(),
+                         tokens=[completion.prompt_tokens, completion.completion_tokens])
+        else:
+            entry["err"] = repr(error)
+        self._write(entry)
+
+    def next_response(self, key: str) -> Optional[Dict]:
+        with self.lock:
+            queue = self.responses.get(key)
+            if queue:
+                return queue.popleft()
+            self.misses += 1
+            return None
+
+    def ask(self, prompt: str) -> str:
+        if self.mode == "record":
+            text = input(prompt)
+            self._write({"t": "input", "text": text})
+            return text
+        if not self.inputs:
+            # like input() at end of file, so prompts that reject blank input can't spin forever
+            print(prompt)
+            raise EOFError("cassette ran out of recorded input (the recording ends here or the replay diverged)")
+        text = self.inputs.popleft()
+        print(f"{prompt}{text}")
+        return text
+
+    def close(self):
+        if self.mode == "record":
+            self.fp.close()
+
+
+class CassetteBackend(Backend):
+    """Records exchanges with `inner`, or with no inner backend answers purely from the cassette"""
+
+    def __init__(self, cassette: Cassette, inner: Optional[Backend] = None):
+        self.cassette = cassette
+        self.inner = inner
+
+    def complete(self, messages: List[Dict], response_format: type, meta: Dict) -> Completion:
+        key = request_key(messages, response_format)
+        if self.inner is None:
+            entry = self.cassette.next_response(key)
+            if entry is None:
+                raise LookupError(f"No recorded response for {meta.get('call')} {meta.get('action') or ''}")
+            if "err" in entry:
+                raise RuntimeError(f"Recorded error: {entry['err']}")
+            return Completion(response_format.model_validate_json(entry["resp"]), *entry["tokens"])
+
+        try:
+            completion = self.inner.complete(messages, response_format, meta)
+        except Exception as e:
+            self.cassette.record_exchange(messages, key, meta, error=e)
+            raise
+        self.cassette.record_exchange(messages, key, meta, completion=completion)
+        return completion
+
+
+_cassette: Optional[Cassette] = None
+
+
+def ask(prompt: str) -> str:
+    """input() that goes through the cassette when recording or replaying"""
+    global _input_wait
+    start = time.perf_counter()
+    try:
+        if _cassette is not None:
+            return _cassette.ask(prompt)
+        return input(prompt)
+    finally:
+        _input_wait += time.perf_counter() - start
+
+
+# ================== NATURAL AI SYSTEM ==================
+ROLE_NAMES = {"L": "Liberal", "F": "Fascist", "H": "Hitler"}
+
+RULES_SUMMARY = """Secret Hitler rules: Liberals win by enacting 5 Liberal policies or executing Hitler.
+Fascists win by enacting 6 Fascist policies or electing Hitler Chancellor after 3 Fascist policies.
+Each round the President nominates a Chancellor and everyone votes Ja or Nein. The President draws 3 policies,
+discards 1 and the Chancellor enacts 1 of the remaining 2. Three failed elections enact the top policy."""
+
+COMMENT_INSTRUCTIONS = """Decide if you want to comment on the current situation. If you do, speak naturally as if playing with friends.
 Consider:
 - Your role and goals
 - Your personality trait
 - What others have been saying
 - Whether this is a good moment to influence the game
-- Don't speak too often (you've spoken recently: {rounds_since_spoke < 3})
+- Don't speak too often
 
 Respond as you would at a real game table. Be genuine, use natural language, show emotion when appropriate.
 If you're lying or deflecting, do it naturally. Reference specific events or players when relevant."""
 
+DECIDE_INSTRUCTIONS = ("Make the best strategic decision for your team. "
+                       "You may also make a brief comment if it helps your strategy.")
+
+
+def compile_prompt_prefix(player: Player, table: Table):
+    """Fix everything about a seat that cannot change during the game.
+
+    The prefix goes first in every request from this player, so it is byte-identical
+    across calls and provider-side prompt caching can reuse it."""
+    player.teammates = player.visible_teammates(table.players, table.player_count)
+    if player.role == "F":
+        player.known_hitler = next((p.name for p in table.players.values() if p.role == "H"), None)
+
+    lines = [
+        "You're a human playing Secret Hitler with friends. Speak naturally and play to win.",
+        RULES_SUMMARY,
+        f"You are {player.name}, a {player.personality['occupation']} playing Secret Hitler.",
+        f"Your personality trait: {player.personality['trait']}",
+        f"Players: {', '.join(table.order)}",
+        f"Your SECRET role: {ROLE_NAMES[player.role]}",
+    ]
+    if player.teammates:
+        lines.append("Your fascist teammates: " + ", ".join(player.teammates))
+    if player.known_hitler:
+        lines.append("Hitler is: " + player.known_hitler)
+    player.prompt_prefix = "\n".join(lines)
+
+
+def get_ai_comment(player: Player, table: Table, context: str) -> Optional[str]:
+    """Get natural AI commentary based on game situation"""
+
+    # Only the changing parts are built per call; the rest lives in the player's prefix
+    rounds_since_spoke = table.interaction_count - player.last_spoke
+
+    prompt = f"""Current situation: {context}
+Board state: L:{table.liberal_policies}/5 F:{table.fascist_policies}/6 Failed:{table.failed_elections}/3
+Recent policies: {table.recent_record()}
+You last spoke {rounds_since_spoke} interactions ago (spoken recently: {rounds_since_spoke < 3}).
+
+Recent conversation:
+{table.chat_context()}"""
+    notes = player.recall(table.round_num, mentioned_players(table, context))
+    if notes:
+        prompt += f"\n\nThings you remember:\n{notes}"
+    if player.belief:
+        prompt += f"\n\nYour read (chance each is fascist): {player.belief.top_suspects(alive_names(table))}"
+
     try:
-        response = client.beta.chat.completions.parse(
-            model=MODEL,
+        completion = get_backend().complete(
             messages=[
-                {"role": "system", "content": "You're a human playing Secret Hitler with friends. Speak naturally."},
+                {"role": "system", "content": player.prompt_prefix},
+                {"role": "system", "content": COMMENT_INSTRUCTIONS},
                 {"role": "user", "content": prompt}
             ],
-            response_format=AIComment
+            response_format=AIComment,
+            meta={"call": "comment", "player": player.name, "role": player.role, "context": context}
         )
+        table.record_tokens(player.name, "comment", completion)
+        comment = completion.parsed
 
-        comment = response.choices[0].message.parsed
-
-        if comment.wants_to_speak:
-            player.last_spoke = table.interaction_count
-            return comment.text
-        return None
+        return comment.text if comment.wants_to_speak else None
 
     except Exception as e:
-        # Simple fallback
-        if random.random() < 0.3:  # 30% chance to speak on error
+        get_metrics().inc("llm_fallbacks_total", phase="discussion", player=player.name, reason=type(e).__name__)
+        # Simple fallback, seeded per call so concurrent failures stay reproducible
+        rng = random.Random(f"{player.name}|{table.interaction_count}|{context}")
+        if rng.random() < 0.3:  # 30% chance to speak on error
             fallbacks = [
                 "Hmm, interesting...",
                 "I need to think about this.",
                 "Not sure about that.",
                 "Let's see how this plays out."
             ]
-            return random.choice(fallbacks)
+            return rng.choice(fallbacks)
         return None
 
 
-def ai_decide(player: Player, table: Table, action: str, context: str) -> AIDecision:
-    """AI makes game decisions"""
+def alive_names(table: Table) -> List[str]:
+    return [name for name, p in table.players.items() if p.alive]
+
 
-    teammates = player.visible_teammates(table.players, table.player_count)
-    hitler = next((p.name for p in table.players.values() if p.role == "H"), None) if player.role == "F" else None
+def mentioned_players(table: Table, *texts) -> Tuple[str, ...]:
+    """Names of seated players that appear in any of `texts`"""
+    words = name_words(" ".join(str(t) for t in texts))
+    return tuple(name for name in table.players if name in words)
 
-    prompt = f"""You are {player.name} ({player.personality['occupation']}, {player.personality['trait']}).
-SECRET ROLE: {'Liberal' if player.role == 'L' else 'Fascist' if player.role == 'F' else 'Hitler'}
-{'Teammates: ' + ', '.join(teammates) if teammates else ''}
-{'Hitler: ' + hitler if hitler and player.role == 'F' else ''}
 
-Action needed: {action}
+def decide_request(player: Player, table: Table, action: str, context: str,
+                   options: Optional[List] = None, government: Optional[Tuple[str, str]] = None,
+                   can_veto: bool = False) -> Tuple[List[Dict], Dict]:
+    """Messages and meta for a decision, shared by live calls and batch jobs"""
+
+    prompt = f"""Action needed: {action}
 Context: {context}
 Game state: L:{table.liberal_policies}/5 F:{table.fascist_policies}/6
+Recent policies: {table.recent_record()}"""
+    notes = player.recall(table.round_num, mentioned_players(table, context, *(options or []), *(government or ())))
+    if notes:
+        prompt += f"\nThings you remember:\n{notes}"
+    suspicion = player.belief.suspicion() if player.belief else {}
+    if suspicion:
+        prompt += f"\nYour read (chance each is fascist): {player.belief.top_suspects(alive_names(table))}"
+
+    messages = [
+        {"role": "system", "content": player.prompt_prefix},
+        {"role": "system", "content": DECIDE_INSTRUCTIONS},
+        {"role": "user", "content": prompt}
+    ]
+    meta = {
+        "call": "decide", "action": action, "player": player.name, "role": player.role,
+        "allies": player.teammates, "options": options,
+        "government": government, "can_veto": can_veto, "context": context,
+        "suspicion": suspicion,
+    }
+    return messages, meta
+
 
-Make the best strategic decision for your team. You may also make a brief comment if it helps your strategy."""
+def default_decision(action: str) -> AIDecision:
+    """What a player does when the model can't be reached"""
+    return AIDecision(
+        action=action,
+        choice="Ja" if action == "vote" else None,
+        text=None
+    )
+
+
+def ai_decide(player: Player, table: Table, action: str, context: str,
+              options: Optional[List] = None, government: Optional[Tuple[str, str]] = None,
+              can_veto: bool = False) -> AIDecision:
+    """AI makes game decisions"""
 
+    messages, meta = decide_request(player, table, action, context, options, government, can_veto)
     try:
-        response = client.beta.chat.completions.parse(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": "Make strategic game decisions based on your secret role."},
-                {"role": "user", "content": prompt}
-            ],
-            response_format=AIDecision
-        )
-        return response.choices[0].message.parsed
+        completion = get_backend().complete(messages=messages, response_format=AIDecision, meta=meta)
+        table.record_tokens(player.name, action, completion)
+        return completion.parsed
     except Exception as e:
-        # Return defaults
-        return AIDecision(
-            action=action,
-            choice="Ja" if action == "vote" else None,
-            text=None
-        )
+        get_metrics().inc("llm_fallbacks_total", phase=PHASE_OF_ACTION.get(action, "other"),
+                          player=player.name, reason=type(e).__name__)
+        return default_decision(action)
+
+
+def say(table: Table, speaker: str, message: str):
+    """Add a line to the table chat and show it"""
+    table.add_chat(speaker, message)
+    print(f"  {speaker}: {message}")
 
 
 def open_discussion(table: Table, topic: str, min_speakers: int = 0, max_speakers: int = 4):
     """Allow natural discussion where any AI can speak"""
+    with step_timer("discussion"):
+        run_discussion(table, topic, min_speakers, max_speakers)
+
+
+def run_discussion(table: Table, topic: str, min_speakers: int, max_speakers: int):
 
     print(f"\n💬 {topic}")
     print("-" * 40)
 
     table.interaction_count += 1
+    table.refresh_chat_summary()
     alive_ai = [p for p in table.players.values() if p.alive and p.name != "YOU"]
     speakers_count = 0
     max_rounds = 3  # Allow up to 3 rounds of discussion
 
+    def speak(player: Player, text: str):
+        nonlocal speakers_count
+        say(table, player.name, text)
+        player.last_spoke = table.interaction_count
+        speakers_count += 1
+
     for round_num in range(max_rounds):
         spoke_this_round = False
 
         # Shuffle order for natural flow
         random.shuffle(alive_ai)
 
-        for player in alive_ai:
-            # Check if this player wants to speak
-            comment = get_ai_comment(player, table, topic)
+        # Ask only as many players as there are open slots, all at once, then read back in order
+        asked = alive_ai[:max_speakers - speakers_count]
+        comments = fan_out(get_ai_comment, [(player, table, topic) for player in asked])
+
+        followups = []
+        for player, comment in zip(asked, comments):
             if comment:
-                table.add_chat(player.name, comment)
-                speakers_count += 1
+                speak(player, comment)
                 spoke_this_round = True
 
                 # Small chance for immediate response from another player
                 if random.random() < 0.3:
                     responders = [p for p in alive_ai if p != player]
                     if responders:
-                        responder = random.choice(responders)
-                        response = get_ai_comment(responder, table, f"Responding to {player.name}'s comment: {comment}")
-                        if response:
-                            time.sleep(0.5)  # Brief pause for realism
-                            table.add_chat(responder.name, response)
-                            speakers_count += 1
-
-            if speakers_count >= max_speakers:
-                break
+                        followups.append((random.choice(responders), player, comment))
+
+        # Immediate responses are fetched together too, again only for slots still open
+        followups = followups[:max_speakers - speakers_count]
+        responses = fan_out(get_ai_comment, [
+            (responder, table, f"Responding to {player.name}'s comment: {comment}")
+            for responder, player, comment in followups
+        ])
+        for (responder, _, _), response in zip(followups, responses):
+            if response:
+                speak(responder, response)
 
         # If no one spoke this round or we've had enough, end discussion
         if not spoke_this_round or speakers_count >= max_speakers:
             break
 
-        # Small pause between rounds
-        if round_num < max_rounds - 1:
-            time.sleep(0.3)
-
     # Always give human a chance to comment
-    if table.players["YOU"].alive:
-        human_comment = input("  You (press Enter to skip): ").strip()
+    if "YOU" in table.players and table.players["YOU"].alive:
+        human_comment = ask("  You (press Enter to skip): ").strip()
         if human_comment:
-            table.add_chat("YOU", human_comment)
+            say(table, "YOU", human_comment)
 
             # AI might respond to human
             if random.random() < 0.5 and alive_ai:
                 responder = random.choice(alive_ai)
                 response = get_ai_comment(responder, table, f"Responding to human's comment: {human_comment}")
                 if response:
-                    time.sleep(0.5)
-                    table.add_chat(responder.name, response)
+                    speak(responder, response)
 
 
-# ================== GAME PHASES ==================
+# ================== GAME ENGINE ==================
 
-def nomination_phase(table: Table, president: Player) -> Optional[Player]:
-    """Handle chancellor nomination with natural discussion"""
+@dataclass
+class Decision:
+    """A choice the engine is waiting on"""
+    kind: str  # nominate, vote, discard, enact, veto_response, investigate, special_election, execute
+    player: str
+    options: List = field(default_factory=list)
+    context: str = ""
+    can_veto: bool = False
+    government: Optional[Tuple[str, str]] = None  # the president/chancellor pair it concerns
 
-    eligible = [name for name, p in table.players.items()
-                if table.can_be_chancellor(name, president.name)]
 
-    if not eligible:
-        return None
+@dataclass
+class Event:
+    """Something that happened, for clients to display or react to"""
+    kind: str
+    data: Dict = field(default_factory=dict)
+
+
+class GameEngine:
+    """Rules as a state machine around a Table - no printing, prompting or sleeping.
+
+    Clients read `pending` decisions and answer them through `step()`, then
+    drain the events the engine emitted along the way.
+    Actions: nominate/investigate/special_election/execute take a player name,
+    vote and veto_response a bool, discard a card index, enact a card index
+    or "veto" when the decision allows it.
+    """
+
+    def __init__(self, table: Table):
+        self.table = table
+        self.pending: List[Decision] = []
+        self.events: List[Event] = []
+        self.winner: Optional[str] = None
+        self.president: Optional[Player] = None
+        self.chancellor: Optional[Player] = None
+        self.cards: List[str] = []
+        self.votes: Dict[str, bool] = {}
+
+        self.emit("game_start")
+        self.emit("discussion", topic="Opening thoughts", min_speakers=0, max_speakers=3)
+        self._start_round()
+
+    # ----- client API -----
+
+    def drain_events(self) -> List[Event]:
+        events, self.events = self.events, []
+        return events
+
+    def step(self, player: str, action, text: Optional[str] = None):
+        """Answer the pending decision for `player`"""
+        decision = next((d for d in self.pending if d.player == player), None)
+        if decision is None:
+            raise ValueError(f"No decision pending for {player}")
+        if not self._is_legal(decision, action):
+            raise ValueError(f"Illegal {decision.kind} action for {player}: {action!r}")
+
+        self.pending.remove(decision)
+        if text:
+            self.table.add_chat(player, text)
+            self.emit("chat", speaker=player, text=text)
+        getattr(self, f"_on_{decision.kind}")(decision, action)
+
+    # ----- internals -----
+
+    def emit(self, kind: str, **data):
+        self.events.append(Event(kind, data))
+
+    def _is_legal(self, decision: Decision, action) -> bool:
+        if decision.kind in ("vote", "veto_response"):
+            return isinstance(action, bool)
+        if decision.kind == "enact" and action == "veto":
+            return decision.can_veto
+        if decision.kind in ("discard", "enact"):
+            return isinstance(action, int) and 0 <= action < len(decision.options)
+        return action in decision.options
+
+    def _ask(self, kind: str, player: Player, options: List, context: str, can_veto: bool = False):
+        government = (self.president.name, self.chancellor.name) if kind != "nominate" and self.chancellor else None
+        self.pending.append(Decision(kind, player.name, options, context, can_veto, government))
+
+    def _draw(self, n: int) -> List[str]:
+        if len(self.table.deck) < n:
+            self.emit("reshuffle", cards=len(self.table.discards))
+        return self.table.draw(n)
+
+    def _enact(self, policy: str, president: str, chancellor: str):
+        self.table.enact_policy(policy, president, chancellor)
+        self.emit("policy", policy=policy, president=president, chancellor=chancellor,
+                  liberal=self.table.liberal_policies, fascist=self.table.fascist_policies)
+
+    def _game_over(self, win_condition: str):
+        self.winner = win_condition
+        self.pending = []
+        self.emit("game_over", win_condition=win_condition)
+
+    def _next_president(self) -> Player:
+        table = self.table
+        if table.special_election_next:
+            name = table.special_election_next
+            table.special_election_next = None
+            self.emit("president", name=name, special=True)
+            return table.players[name]
+        while True:
+            name = table.order[table.president_idx % len(table.order)]
+            table.president_idx += 1
+            if table.players[name].alive:
+                self.emit("president", name=name, special=False)
+                return table.players[name]
+
+    def _start_round(self):
+        self.emit("round", round_num=self.table.round_num)
+        while True:
+            president = self._next_president()
+            eligible = [name for name in self.table.players
+                        if self.table.can_be_chancellor(name, president.name)]
+            if eligible:
+                break
 
-    print(f"\n{'=' * 60}")
-    print(f"🎩 President {president.name} must nominate a Chancellor")
-    print(f"Eligible: {', '.join(eligible)}")
+        self.president = president
+        self.chancellor = None
+        self.table.phase = "nomination"
+        self.emit("nominating", president=president.name, eligible=eligible)
+        self.emit("discussion", topic=f"{president.name} is considering chancellor options",
+                  min_speakers=0, max_speakers=2)
+        self._ask("nominate", president, eligible, f"Choose from: {eligible}")
+
+    def _end_round(self):
+        self.table.round_num += 1
+        self.emit("round_end")
+        self._start_round()
+
+    def _on_nominate(self, decision: Decision, target: str):
+        president = self.president
+        self.chancellor = self.table.players[target]
+        self.emit("nomination", president=president.name, chancellor=target)
+        self.emit("discussion", topic=f"Reaction to {target}'s nomination", min_speakers=0, max_speakers=3)
+
+        self.votes = {}
+        self.table.phase = "election"
+        self.emit("election", president=president.name, chancellor=target)
+        for p in self.table.players.values():
+            if p.alive:
+                self._ask("vote", p, [True, False], f"Vote on {president.name} + {target}")
+
+    def _on_vote(self, decision: Decision, ja: bool):
+        self.votes[decision.player] = ja
+        if any(d.kind == "vote" for d in self.pending):
+            return
+
+        table, president, chancellor = self.table, self.president, self.chancellor
+        # Report in seating order regardless of the order votes arrived in
+        votes = {name: self.votes[name] for name in table.players if name in self.votes}
+        for player in table.players.values():
+            if player.belief and player.alive:
+                player.belief.observe_votes(president.name, chancellor.name, votes)
+        for name, vote in votes.items():
+            table.record("vote", name, ja=vote, government=(president.name, chancellor.name))
+            table.players[name].remember(f"Voted {'Ja' if vote else 'Nein'} for {president.name}+{chancellor.name}",
+                                         when=table.round_num)
+
+        ja_count = sum(votes.values())
+        passed = ja_count > len(votes) / 2
+        self.emit("vote_result", votes=votes, passed=passed, ja=ja_count, total=len(votes))
+
+        if not passed:
+            table.failed_elections += 1
+            self.emit("discussion", topic="Reaction to failed vote", min_speakers=0, max_speakers=2)
+
+            if table.failed_elections >= 3:
+                self.emit("chaos")
+                chaos_policy = self._draw(1)[0]
+                self._enact(chaos_policy, "CHAOS", "CHAOS")
+                table.failed_elections = 0
+                self.emit("discussion", topic=f"Chaos enacted {chaos_policy} policy!", min_speakers=0, max_speakers=3)
+                win_condition = table.check_win_conditions()
+                if win_condition:
+                    return self._game_over(win_condition)
+            return self._end_round()
 
-    # Pre-nomination discussion
-    open_discussion(table, f"{president.name} is considering chancellor options", max_speakers=2)
+        table.failed_elections = 0
+        table.last_government = (president.name, chancellor.name)
+        table.record("government", president.name, chancellor.name)
+        table.update_term_limits()
 
-    if president.name == "YOU":
-        while True:
-            choice = input("\nNominate Chancellor: ").strip()
-            if choice in eligible:
-                break
-            print(f"Invalid. Choose from: {', '.join(eligible)}")
-    else:
-        decision = ai_decide(president, table, "nominate", f"Choose from: {eligible}")
-        choice = decision.target if decision.target in eligible else random.choice(eligible)
+        if table.fascist_policies >= 3 and chancellor.role == "H":
+            return self._game_over("HITLER_CHANCELLOR")
+
+        table.phase = "legislative"
+        self.emit("legislative")
+        self.cards = self._draw(3)
+        self._ask("discard", president, list(self.cards), f"Drew {self.cards}, discard one")
+
+    def _on_discard(self, decision: Decision, idx: int):
+        self.table.discards.append(self.cards.pop(idx))
+        self.emit("cards_passed", veto_enabled=self.table.veto_enabled)
+        self._ask("enact", self.chancellor, list(self.cards), f"Received {self.cards}",
+                  can_veto=self.table.veto_enabled)
+
+    def _on_enact(self, decision: Decision, action):
+        table, president, chancellor = self.table, self.president, self.chancellor
+        if action == "veto":
+            self.emit("veto_proposed", chancellor=chancellor.name)
+            self._ask("veto_response", president, [True, False], "Veto proposed")
+            return
+
+        enacted = self.cards[action]
+        forced = self.cards[0] == self.cards[1]
+        table.discards.append(self.cards[1 - action])
+        self._enact(enacted, president.name, chancellor.name)
+        for player in table.players.values():
+            # The government knows when the chancellor had no choice
+            if player.belief and player.alive and not (forced and player.name in (president.name, chancellor.name)):
+                player.belief.observe_policy(president.name, chancellor.name, enacted == "F")
+
+        # Natural claiming phase
+        self.emit("discussion",
+                  topic=f"{'Liberal' if enacted == 'L' else 'Fascist'} policy was enacted. "
+                        f"{president.name} and {chancellor.name}, what happened?",
+                  min_speakers=2, max_speakers=5)
+
+        win_condition = table.check_win_conditions()
+        if win_condition:
+            return self._game_over(win_condition)
+
+        power = table.get_current_power() if enacted == "F" else None
+        if not power:
+            return self._end_round()
+
+        table.phase = "executive"
+        self.emit("power", power=power, president=president.name)
+        targets = [p.name for p in table.players.values() if p.alive and p.name != president.name]
+        if power == "INVESTIGATE_LOYALTY":
+            self.emit("discussion", topic=f"{president.name} must investigate someone. Who seems suspicious?",
+                      min_speakers=0, max_speakers=3)
+            self._ask("investigate", president, targets, "Choose target")
+        elif power == "SPECIAL_ELECTION":
+            self.emit("discussion", topic=f"{president.name} will choose the next President",
+                      min_speakers=0, max_speakers=2)
+            self._ask("special_election", president, targets, "Choose next President")
+        elif power == "EXECUTION":
+            self.emit("discussion", topic=f"{president.name} must execute someone. This is crucial!",
+                      min_speakers=2, max_speakers=5)
+            self._ask("execute", president, targets, "Choose who to execute")
+
+    def _on_veto_response(self, decision: Decision, approved: bool):
+        self.table.record("veto", self.president.name, self.chancellor.name, approved=approved)
+        self.emit("veto", approved=approved)
+        if approved:
+            self.table.discards.extend(self.cards)
+            self.cards = []
+            self.table.failed_elections += 1
+            self.emit("discussion", topic="Reaction to vetoed agenda", min_speakers=0, max_speakers=2)
+            return self._end_round()
+        self._ask("enact", self.chancellor, list(self.cards), f"Received {self.cards}, veto rejected")
+
+    def _on_investigate(self, decision: Decision, target_name: str):
+        president = self.president
+        target = self.table.players[target_name]
+        party = "Fascist" if target.role in ["F", "H"] else "Liberal"
 
-        # President might explain choice
-        if decision.text:
-            print(f"\n{president.name}: {decision.text}")
-            table.add_chat(president.name, decision.text)
+        president.investigated_players[target_name] = party
+        self.table.record("investigation", president.name, target_name, party=party)
+        president.remember(f"Investigated {target_name}: {party}", importance=3, when=self.table.round_num)
+        if president.belief:
+            president.belief.condition(target_name, party == "Fascist")
+        self.emit("investigation", president=president.name, target=target_name, party=party)
+
+        self.emit("discussion", topic=f"{president.name} investigated {target_name}. What does this mean?",
+                  min_speakers=1, max_speakers=4)
+        self._end_round()
+
+    def _on_special_election(self, decision: Decision, target_name: str):
+        self.table.special_election_next = target_name
+        self.table.record("special_election", self.president.name, target_name)
+        self.emit("special_election", president=self.president.name, target=target_name)
+        self._end_round()
+
+    def _on_execute(self, decision: Decision, target_name: str):
+        target = self.table.players[target_name]
+        target.alive = False
+        self.table.record("execution", self.president.name, target_name)
+        self.emit("execution", president=self.president.name, target=target_name)
+        self.emit("discussion", topic=f"Reaction to {target_name}'s execution", min_speakers=1, max_speakers=3)
 
-    chancellor = table.players[choice]
-    print(f"\n➜ {president.name} nominates {chancellor.name} as Chancellor")
+        if target.role == "H":
+            return self._game_over("HITLER_EXECUTED")
+        self._end_round()
 
-    # Immediate reactions to nomination
-    open_discussion(table, f"Reaction to {chancellor.name}'s nomination", max_speakers=3)
 
-    return chancellor
+# ================== AGENTS ==================
 
+class Agent:
+    """Answers engine decisions for one seat.
 
-def voting_phase(table: Table, president: Player, chancellor: Player) -> bool:
-    """Voting with natural pre-vote discussion"""
+    decide() returns (action, optional table talk). Agents that block on the
+    network set `concurrent` so simultaneous decisions (votes) run in parallel.
+    """
+    concurrent = False
 
-    print(f"\n{'=' * 60}")
-    print(f"🗳️ VOTE on {president.name} (President) + {chancellor.name} (Chancellor)")
+    def decide(self, decision: Decision, table: Table) -> Tuple[object, Optional[str]]:
+        raise NotImplementedError
 
 
-    # Collect votes
-    print("\n[Voting]")
-    votes = {}
+class RandomAgent(Agent):
+    """Uniformly random legal moves - for fast headless games"""
 
-    for p in table.players.values():
-        if not p.alive:
-            continue
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng or random.Random()
 
-        if p.name == "YOU":
-            while True:
-                vote = input(f"Your vote (ja/nein): ").strip().lower()
-                if vote in ["ja", "nein", "j", "n"]:
-                    votes[p.name] = vote.startswith("j")
-                    break
-        else:
-            decision = ai_decide(p, table, "vote", f"Vote on {president.name} + {chancellor.name}")
-            votes[p.name] = (decision.choice or "Ja").lower().startswith("j")
-            p.remember(f"Voted {'Ja' if votes[p.name] else 'Nein'} for {president.name}+{chancellor.name}")
+    def decide(self, decision: Decision, table: Table) -> Tuple[object, Optional[str]]:
+        if decision.kind in ("discard", "enact"):
+            return self.rng.randrange(len(decision.options)), None
+        return self.rng.choice(decision.options), None
 
-    # Show results
-    print("\nResults:")
-    for name, vote in votes.items():
-        print(f"  {name}: {'Ja ✓' if vote else 'Nein ✗'}")
 
-    ja_count = sum(votes.values())
-    total = len(votes)
-    passed = ja_count > total / 2
+class LLMAgent(Agent):
+    """Asks the model through ai_decide and repairs anything illegal it answers"""
+    concurrent = True
 
-    print(f"\n{'✅ PASSED' if passed else '❌ FAILED'}: {ja_count}/{total} Ja votes")
+    def decide(self, decision: Decision, table: Table) -> Tuple[object, Optional[str]]:
+        player = table.players[decision.player]
+        result = ai_decide(player, table, decision.kind, decision.context, options=decision.options,
+                           government=decision.government, can_veto=decision.can_veto)
+        return self.interpret(decision, result)
 
-    if passed:
-        table.failed_elections = 0
-        table.last_government = (president.name, chancellor.name)
-        table.governments_formed.append((president.name, chancellor.name))
-        table.update_term_limits()
-    else:
-        table.failed_elections += 1
+    @staticmethod
+    def interpret(decision: Decision, result: AIDecision) -> Tuple[object, Optional[str]]:
+        """Turn a model answer into a legal engine action"""
+        kind = decision.kind
 
-        # Post-vote reactions
-        open_discussion(table, f"Reaction to failed vote", max_speakers=2)
+        def repaired(value):
+            get_metrics().inc("llm_repairs_total", phase=PHASE_OF_ACTION[kind], player=decision.player)
+            return value
 
-        if table.failed_elections >= 3:
-            print("\n⚠️ CHAOS! Three failed elections!")
-            chaos_policy = table.draw(1)[0]
-            table.enact_policy(chaos_policy, "CHAOS", "CHAOS")
-            table.failed_elections = 0
-            open_discussion(table, f"Chaos enacted {chaos_policy} policy!", max_speakers=3)
+        if kind == "vote":
+            return (result.choice or "Ja").lower().startswith("j"), None
+        if kind == "veto_response":
+            return bool(result.veto), None
+        if kind == "discard":
+            idx = result.discard_index
+            if idx not in range(len(decision.options)):
+                idx = repaired(random.randrange(len(decision.options)))
+            return idx, None
+        if kind == "enact":
+            if decision.can_veto and result.veto:
+                return "veto", None
+            idx = result.enact_index or 0
+            if idx not in range(len(decision.options)):
+                idx = repaired(0)
+            return idx, None
+        # nominate / investigate / special_election / execute
+        target = result.target if result.target in decision.options else repaired(random.choice(decision.options))
+        return target, result.text
 
-    return passed
 
+class ConsoleAgent(Agent):
+    """The human at the terminal"""
 
-def legislative_phase(table: Table, president: Player, chancellor: Player):
-    """Policy enactment with natural discussion"""
+    def decide(self, decision: Decision, table: Table) -> Tuple[object, Optional[str]]:
+        kind, options = decision.kind, decision.options
 
-    print(f"\n{'=' * 60}")
-    print("📋 LEGISLATIVE SESSION")
+        if kind == "nominate":
+            while True:
+                choice = ask("\nNominate Chancellor: ").strip()
+                if choice in options:
+                    return choice, None
+                print(f"Invalid. Choose from: {', '.join(options)}")
 
-    # Draw cards
-    cards = table.draw(3)
+        if kind == "vote":
+            while True:
+                vote = ask(f"Your vote (ja/nein): ").strip().lower()
+                if vote in ["ja", "nein", "j", "n"]:
+                    return vote.startswith("j"), None
 
-    # President discards
-    if president.name == "YOU":
-        print(f"You drew: {cards}")
-        while True:
-            try:
-                idx = int(input("Discard (0, 1, or 2): "))
-                if 0 <= idx <= 2:
-                    break
-            except ValueError:
-                pass
-    else:
-        decision = ai_decide(president, table, "discard", f"Drew {cards}, discard one")
-        idx = decision.discard_index or random.randint(0, 2)
+        if kind == "discard":
+            print(f"You drew: {options}")
+            return self._ask_index("Discard (0, 1, or 2): ", len(options)), None
 
-    discarded = cards.pop(idx)
-    table.discards.append(discarded)
+        if kind == "enact":
+            print(f"You received: {options}")
+            if decision.can_veto and ask("Propose veto? (y/n): ").strip().lower() == 'y':
+                return "veto", None
+            return self._ask_index("Enact (0 or 1): ", len(options)), None
 
-    print("President passes 2 cards to Chancellor...")
+        if kind == "veto_response":
+            return ask("Approve veto? (y/n): ").strip().lower() == 'y', None
 
-    # Chancellor enacts
-    if table.veto_enabled:
-        print("⚠️ Veto power ACTIVE")
-
-    if chancellor.name == "YOU":
-        print(f"You received: {cards}")
-
-        if table.veto_enabled:
-            if input("Propose veto? (y/n): ").strip().lower() == 'y':
-                if president.name == "YOU":
-                    veto_approved = input("Approve veto? (y/n): ").strip().lower() == 'y'
-                else:
-                    veto_decision = ai_decide(president, table, "veto", "Chancellor proposes veto")
-                    veto_approved = veto_decision.veto or False
-
-                if veto_approved:
-                    print("✅ Veto approved!")
-                    table.discards.extend(cards)
-                    table.failed_elections += 1
-                    return
-                print("❌ Veto rejected")
+        prompt = {"investigate": "Investigate: ", "special_election": "Choose next President: ",
+                  "execute": "Execute: "}[kind]
+        while True:
+            target_name = ask(prompt).strip()
+            if target_name in options:
+                return target_name, None
 
+    @staticmethod
+    def _ask_index(prompt: str, count: int) -> int:
         while True:
             try:
-                idx = int(input("Enact (0 or 1): "))
-                if 0 <= idx <= 1:
-                    break
+                idx = int(ask(prompt))
+                if 0 <= idx < count:
+                    return idx
             except ValueError:
                 pass
-        enacted = cards[idx]
-    else:
-        decision = ai_decide(chancellor, table, "enact", f"Received {cards}")
 
-        if table.veto_enabled and decision.veto:
-            print(f"{chancellor.name} proposes VETO!")
 
-            if president.name == "YOU":
-                veto_approved = input("Approve veto? (y/n): ").strip().lower() == 'y'
-            else:
-                veto_decision = ai_decide(president, table, "veto_response", "Veto proposed")
-                veto_approved = veto_decision.veto or False
+def play_game(engine: GameEngine, agents: Dict[str, Agent], on_event=None,
+              checkpoint: Optional[str] = None) -> str:
+    """Drive an engine to the end with one agent per seat; returns the win condition.
 
-            if veto_approved:
-                print("✅ Veto approved!")
-                table.discards.extend(cards)
-                table.failed_elections += 1
+    With `checkpoint`, the game is snapshotted there whenever it enters a new phase.
+    """
 
-                open_discussion(table, "Reaction to vetoed agenda", max_speakers=2)
-                return
-            print("❌ Veto rejected")
+    def flush():
+        for event in engine.drain_events():
+            if on_event:
+                on_event(event)
 
-        idx = decision.enact_index or 0
-        enacted = cards[idx if idx < len(cards) else 0]
+    saved_at = None
+    while True:
+        # Snapshot before the events are shown, so a resumed game replays them
+        if checkpoint and engine.winner is None and (engine.table.round_num, engine.table.phase) != saved_at:
+            save_snapshot(checkpoint, engine)
+            saved_at = (engine.table.round_num, engine.table.phase)
+        flush()
+        if engine.winner is not None:
+            break
+        decisions = list(engine.pending)
+        with step_timer(PHASE_OF_ACTION[decisions[0].kind]) as step:
+            # Network-bound agents answer simultaneous decisions in parallel while
+            # local ones (the human) answer in the meantime
+            futures = {}
+            if len(decisions) > 1:
+                futures = {d.player: get_executor().submit(agents[d.player].decide, d, engine.table)
+                           for d in decisions if agents[d.player].concurrent}
+            results = {d.player: agents[d.player].decide(d, engine.table)
+                       for d in decisions if d.player not in futures}
+            for name, future in futures.items():
+                results[name] = future.result()
+
+            # Apply in seating order so the game stays reproducible
+            for d in decisions:
+                action, text = results[d.player]
+                if action == "veto":
+                    # a chancellor proposing a veto belongs to the veto phase, not enact
+                    step["phase"] = "veto"
+                engine.step(d.player, action, text)
+    return engine.winner
+
+
+# ================== BATCH JOBS ==================
+
+class BatchClient:
+    """Somewhere to send a JSONL file of requests and later collect the answers.
+
+    Each line of an input file is `encode(...)` for one request; `submit`
+    returns a job id and `poll` returns the path of the output file once
+    the job has finished (None while it is still running).
+    """
+
+    def encode(self, custom_id: str, messages: List[Dict], response_format: type, meta: Dict) -> Dict:
+        raise NotImplementedError
+
+    def decode(self, line: Dict, response_format: type) -> Completion:
+        """Completion for one output line; raises if that request failed"""
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            raise RuntimeError(f"batch request {line.get('custom_id')} failed: {line.get('error') or response}")
+        body = response["body"]
+        usage = body.get("usage") or {}
+        return Completion(
+            parsed=response_format.model_validate_json(body["choices"][0]["message"]["content"]),
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0)
+        )
 
-    table.discards.append(cards[1 - idx if idx < len(cards) else 0])
-    table.enact_policy(enacted, president.name, chancellor.name)
+    def submit(self, path: str) -> str:
+        raise NotImplementedError
+
+    def poll(self, job_id: str) -> Optional[str]:
+        raise NotImplementedError
+
+
+class OpenAIBatchClient(BatchClient):
+    """OpenAI Batch API - half price, results within the completion window"""
+
+    def __init__(self, model: str = MODEL, completion_window: str = "24h"):
+        self.model = model
+        self.completion_window = completion_window
+        self.client = OpenAI()
+        self.inputs: Dict[str, str] = {}
+
+    def encode(self, custom_id: str, messages: List[Dict], response_format: type, meta: Dict) -> Dict:
+        return {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": self.model,
+                "messages": messages,
+                "response_format": {
+                    "type": "json_schema",
+                    "json_schema": {"name": response_format.__name__,
+                                    "schema": response_format.model_json_schema()},
+                },
+            },
+        }
+
+    def submit(self, path: str) -> str:
+        with open(path, "rb") as f:
+            upload = self.client.files.create(file=f, purpose="batch")
+        job = self.client.batches.create(input_file_id=upload.id, endpoint="/v1/chat/completions",
+                                         completion_window=self.completion_window)
+        self.inputs[job.id] = path
+        return job.id
+
+    def poll(self, job_id: str) -> Optional[str]:
+        job = self.client.batches.retrieve(job_id)
+        if job.status in ("failed", "expired", "cancelled"):
+            raise RuntimeError(f"batch {job_id} {job.status}")
+        if job.status != "completed":
+            return None
+
+        # Requests missing from the output file come back through the error file
+        out = self.inputs[job_id][:-len(".jsonl")] + ".out.jsonl"
+        with open(out, "wb") as f:
+            for file_id in (job.output_file_id, job.error_file_id):
+                if file_id:
+                    f.write(self.client.files.content(file_id).read())
+        return out
+
+
+class LocalBatchClient(BatchClient):
+    """Stand-in batch endpoint that answers from a Backend (usually FakeBackend).
+
+    Writes output files in the provider's format so the same decode path is
+    exercised; a job only reports done `turnaround` seconds after submission.
+    """
+
+    def __init__(self, backend: Backend, turnaround: float = 0.0):
+        self.backend = backend
+        self.turnaround = turnaround
+        self.jobs: Dict[str, Tuple[str, float]] = {}
+
+    def encode(self, custom_id: str, messages: List[Dict], response_format: type, meta: Dict) -> Dict:
+        return {"custom_id": custom_id, "body": {"messages": messages}, "meta": meta}
+
+    def submit(self, path: str) -> str:
+        job_id = f"local-{len(self.jobs) + 1}"
+        self.jobs[job_id] = (path, time.monotonic() + self.turnaround)
+        return job_id
+
+    def poll(self, job_id: str) -> Optional[str]:
+        path, ready_at = self.jobs[job_id]
+        if time.monotonic() < ready_at:
+            return None
+
+        out = path[:-len(".jsonl")] + ".out.jsonl"
+        with open(path) as src, open(out, "w") as dst:
+            for raw in src:
+                request = json.loads(raw)
+                result = {"custom_id": request["custom_id"], "response": None, "error": None}
+                try:
+                    completion = self.backend.complete(request["body"]["messages"], AIDecision, request["meta"])
+                    result["response"] = {"status_code": 200, "body": {
+                        "choices": [{"message": {"content": completion.parsed.model_dump_json()}}],
+                        "usage": {"prompt_tokens": completion.prompt_tokens,
+                                  "completion_tokens": completion.completion_tokens},
+                    }}
+                except Exception as e:
+                    result["error"] = {"message": str(e)}
+                dst.write(json.dumps(result) + "\n")
+        return out
+
+
+def run_batch_games(tables: List[Table], client: BatchClient, workdir: str,
+                    poll_interval: float = 30.0) -> List[str]:
+    """Play AI-only games by shipping their decisions in batch jobs.
+
+    Every game waiting on a decision contributes it to the next job, so one
+    job advances all unfinished games by one step; each game resumes as soon
+    as the job's results are in. Table talk is skipped - only decisions are
+    requested. Returns each game's win condition.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    engines = [GameEngine(table) for table in tables]
+    wave = 0
 
-    # Policy discussion - claims and reactions
-    print("\n[Policy Discussion]")
+    while True:
+        requests = {}
+        for g, engine in enumerate(engines):
+            engine.drain_events()
+            if engine.winner is not None:
+                continue
+            for d in engine.pending:
+                player = engine.table.players[d.player]
+                messages, meta = decide_request(player, engine.table, d.kind, d.context,
+                                                d.options, d.government, d.can_veto)
+                requests[f"g{g}-w{wave}-{d.player}"] = (g, d, messages, meta)
+        if not requests:
+            break
 
-    # Natural claiming phase
-    open_discussion(table,
-                    f"{'Liberal' if enacted == 'L' else 'Fascist'} policy was enacted. {president.name} and {chancellor.name}, what happened?",
-                    min_speakers=2, max_speakers=5)
+        path = os.path.join(workdir, f"wave-{wave:04d}.jsonl")
+        with open(path, "w") as f:
+            for custom_id, (_, _, messages, meta) in requests.items():
+                f.write(json.dumps(client.encode(custom_id, messages, AIDecision, meta)) + "\n")
+        job_id = client.submit(path)
+        print(f"Wave {wave}: {len(requests)} decisions from {len({g for g, *_ in requests.values()})} games ({job_id})")
+
+        out = client.poll(job_id)
+        while out is None:
+            time.sleep(poll_interval)
+            out = client.poll(job_id)
+
+        answers = {}
+        with open(out) as f:
+            for raw in f:
+                line = json.loads(raw)
+                try:
+                    answers[line["custom_id"]] = client.decode(line, AIDecision)
+                except Exception as e:
+                    print(f"  {e}")
+
+        # Apply in seating order, as play_game does
+        for custom_id, (g, d, _, _) in requests.items():
+            table = engines[g].table
+            completion = answers.get(custom_id)
+            if completion:
+                table.record_tokens(d.player, d.kind, completion)
+                result = completion.parsed
+            else:
+                get_metrics().inc("llm_fallbacks_total", phase=PHASE_OF_ACTION[d.kind], player=d.player,
+                                  reason="batch")
+                result = default_decision(d.kind)
+            action, text = LLMAgent.interpret(d, result)
+            engines[g].step(d.player, action, text)
+        wave += 1
 
+    return [engine.winner for engine in engines]
 
-def execute_power(table: Table, president: Player, power: str):
-    """Execute presidential powers with discussion"""
 
-    print(f"\n{'=' * 60}")
-    print(f"⚡ PRESIDENTIAL POWER: {power}")
+# ================== TOURNAMENTS ==================
 
-    alive_players = [p for p in table.players.values() if p.alive and p.name != president.name]
+AGENT_TYPES = {"random": RandomAgent, "llm": LLMAgent}
 
-    if power == "INVESTIGATE_LOYALTY":
-        # Pre-investigation discussion
-        open_discussion(table, f"{president.name} must investigate someone. Who seems suspicious?", max_speakers=3)
+LIBERAL_WINS = ("LIBERAL_POLICY", "HITLER_EXECUTED")
 
-        if president.name == "YOU":
-            while True:
-                target_name = input("Investigate: ").strip()
-                if target_name in [p.name for p in alive_players]:
-                    break
-        else:
-            decision = ai_decide(president, table, "investigate", "Choose target")
-            target_name = decision.target or random.choice([p.name for p in alive_players])
-            if decision.text:
-                table.add_chat(president.name, decision.text)
 
-        target = table.players[target_name]
-        party = "Fascist" if target.role in ["F", "H"] else "Liberal"
+def parse_agent_spec(spec: str) -> Dict[str, str]:
+    """"llm" seats everyone alike; "L=llm,F=random" picks per team (F covers Hitler)"""
+    if "=" not in spec:
+        spec = f"L={spec},F={spec}"
+    agents = {}
+    for part in spec.split(","):
+        team, _, kind = part.partition("=")
+        if team not in ("L", "F") or kind not in AGENT_TYPES:
+            raise ValueError(f"bad agent spec {part!r}: want L|F=" + "|".join(AGENT_TYPES))
+        agents[team] = kind
+    agents.setdefault("L", "random")
+    agents.setdefault("F", "random")
+    return agents
 
-        president.investigated_players[target_name] = party
-        table.investigation_history.append((president.name, target_name, party))
 
-        if president.name == "YOU":
-            print(f"\n🔍 {target_name} is {party}")
-        else:
-            president.remember(f"Investigated {target_name}: {party}", importance=3)
-            president.update_suspicion(target_name, 5 if party == "Fascist" else -3)
+def _init_tournament_worker(args, spec: Dict[str, str]):
+    # LLM agents in a worker need their own backend; nothing else is shared
+    if "llm" not in spec.values():
+        return
+    if args.backend == "fake":
+        set_backend(FakeBackend(latency=args.fake_latency, jitter=args.fake_jitter,
+                                error_rate=args.fake_error_rate, timeout=args.fake_timeout, seed=args.seed))
+    else:
+        set_backend(OpenAIBackend(model=args.model))
+
+
+def tournament_game(job: Tuple[int, int, int, Dict[str, str]]) -> Dict:
+    """Play one all-AI game headless; everything random flows from the game's own seed"""
+    index, players, seed, spec = job
+    random.seed(seed)
+    # Workers share one --seed; restart the fake backend's stream per game so games stay independent.
+    # Only LLM seats have a backend - looking one up otherwise would build an OpenAI client.
+    fake = find_backend(FakeBackend) if "llm" in spec.values() else None
+    if fake is not None:
+        fake.reseed(f"{seed}-backend")
+    table = create_table(players, beliefs="llm" in spec.values())
+    agents = {}
+    for name, player in table.players.items():
+        kind = spec["L" if player.role == "L" else "F"]
+        agents[name] = RandomAgent(random.Random(f"{seed}-{name}")) if kind == "random" else AGENT_TYPES[kind]()
+    win_condition = play_game(GameEngine(table), agents)
+    return {
+        "game": index,
+        "players": players,
+        "seed": seed,
+        "winner": "Liberal" if win_condition in LIBERAL_WINS else "Fascist",
+        "win_condition": win_condition,
+        "rounds": table.round_num,
+        "liberal_policies": table.liberal_policies,
+        "fascist_policies": table.fascist_policies,
+        "executions": table.log.count("execution"),
+    }
 
-        # Post-investigation discussion
-        open_discussion(table, f"{president.name} investigated {target_name}. What does this mean?", min_speakers=1,
-                        max_speakers=4)
 
-    elif power == "SPECIAL_ELECTION":
-        open_discussion(table, f"{president.name} will choose the next President", max_speakers=2)
+def tournament_report(results: List[Dict]) -> Dict:
+    """Win rates and game shape per player count, plus an overall row"""
+    groups = defaultdict(list)
+    for r in results:
+        groups[r["players"]].append(r)
+        groups["all"].append(r)
+
+    report = {}
+    for key, games in groups.items():
+        n = len(games)
+        report[str(key)] = {
+            "games": n,
+            "liberal_win_rate": sum(g["winner"] == "Liberal" for g in games) / n,
+            "win_conditions": dict(Counter(g["win_condition"] for g in games)),
+            "avg_rounds": sum(g["rounds"] for g in games) / n,
+            "avg_liberal_policies": sum(g["liberal_policies"] for g in games) / n,
+            "avg_fascist_policies": sum(g["fascist_policies"] for g in games) / n,
+            "avg_executions": sum(g["executions"] for g in games) / n,
+        }
+    return report
+
+
+def run_tournament(args):
+    """Self-play N games spread over player counts 5-10 on a process pool"""
+    spec = parse_agent_spec(args.agents)
+    counts = sorted(BOARD_CONFIGS) if args.players == "all" else [int(n) for n in args.players.split(",")]
+    base_seed = args.seed if args.seed is not None else random.randrange(2 ** 31)
+    jobs = [(i, counts[i % len(counts)], base_seed * 1_000_003 + i, spec) for i in range(args.tournament)]
+
+    results = []
+    out = open(args.tournament_out, "w") if args.tournament_out else None
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_tournament_worker,
+                             initargs=(args, spec)) as pool:
+        chunksize = max(1, len(jobs) // (4 * (args.workers or os.cpu_count() or 1)))
+        for result in pool.map(tournament_game, jobs, chunksize=chunksize):
+            results.append(result)
+            if out:
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+    if out:
+        out.close()
+    elapsed = time.perf_counter() - start
+
+    report = tournament_report(results)
+    print(f"{len(results)} games in {elapsed:.1f}s ({len(results) / elapsed:.0f} games/s), "
+          f"seed {base_seed}, agents L={spec['L']} F={spec['F']}")
+    print(f"{'players':>8} {'games':>6} {'lib win':>8} {'rounds':>7} {'L pol':>6} {'F pol':>6} {'exec':>5}")
+    for key in sorted(report, key=lambda k: (k == "all", int(k) if k != "all" else 0)):
+        row = report[key]
+        print(f"{key:>8} {row['games']:>6} {row['liberal_win_rate']:>8.1%} {row['avg_rounds']:>7.1f} "
+              f"{row['avg_liberal_policies']:>6.2f} {row['avg_fascist_policies']:>6.2f} {row['avg_executions']:>5.2f}")
+    return report
+
+
+# ================== LOCKSTEP SIMULATOR ==================
+#
+# Whole batches of games advanced one round at a time as NumPy arrays, for
+# balance questions that need millions of games. The deck is kept as counts
+# (drawing k cards from a shuffled deck is a hypergeometric draw) and play is
+# a handful of parametric policies; the rules mirror GameEngine/Table step
+# for step, including its quirks (chaos keeps term limits, a veto counts
+# towards the election tracker without triggering chaos itself).
+
+SIM_POLICY = {
+    "liberal_ja": 0.6,  # anyone who doesn't know the teams (liberals, Hitler)
+    "fascist_ja": 0.5,  # fascist voting on a government with no ally in it
+    "fascist_ja_ally": 0.95,
+    "liberal_ja_hitler_zone": 0.4,  # once electing Hitler would end the game
+    "fascist_nominate_ally": 0.6,
+    "fascist_nominate_hitler": 0.9,  # once 3 fascist policies make it a win
+    "fascist_discard_L": 0.8,  # fascist/Hitler president holding a liberal
+    "fascist_enact_F": 0.8,  # fascist/Hitler chancellor holding a fascist
+}
 
-        if president.name == "YOU":
-            while True:
-                target_name = input("Choose next President: ").strip()
-                if target_name in [p.name for p in alive_players]:
-                    break
-        else:
-            decision = ai_decide(president, table, "special_election", "Choose next President")
-            target_name = decision.target or random.choice([p.name for p in alive_players])
-            if decision.text:
-                table.add_chat(president.name, decision.text)
+SIM_WIN_CONDITIONS = ("", "LIBERAL_POLICY", "HITLER_EXECUTED", "FASCIST_POLICY", "HITLER_CHANCELLOR")
+SIM_MAX_ROUNDS = 60
+
+
+def _pick(rng: np.random.Generator, mask: np.ndarray) -> np.ndarray:
+    """Per row, a uniformly random column where mask is True (0 for empty rows)"""
+    keys = rng.random(mask.shape)
+    keys[~mask] = -1.0
+    return keys.argmax(axis=1)
+
+
+class LockstepSim:
+    """`games` independent n-player games whose state lives in (games,) / (games, n) arrays"""
+
+    def __init__(self, n: int, games: int, rng: np.random.Generator, policy: Optional[Dict] = None,
+                 config: Optional[Dict] = None, veto_threshold: int = VETO_THRESHOLD):
+        self.n, self.games, self.rng = n, games, rng
+        self.policy = {**SIM_POLICY, **(policy or {})}
+        self.config = config or BOARD_CONFIGS[n]
+        self.veto_threshold = veto_threshold
+        self.power = np.array([self.config["powers"].get(k) or "" for k in range(7)], dtype=object)
+        self.rows = np.arange(games)
+
+        # 0 liberal, 1 fascist, 2 Hitler - dealt by shuffling a role vector per game
+        f = self.config["fascist_count"]
+        base = np.array([2] + [1] * f + [0] * (n - f - 1), dtype=np.int8)
+        self.role = base[np.argsort(rng.random((games, n)), axis=1)]
+        self.hitler = (self.role == 2).argmax(axis=1)
+
+        self.alive = np.ones((games, n), dtype=bool)
+        self.deck = np.zeros((games, 2), dtype=np.int16)  # [liberal, fascist] counts
+        self.deck[:] = (6, 11)
+        self.discards = np.zeros((games, 2), dtype=np.int16)
+        self.track = np.zeros((games, 2), dtype=np.int8)
+        self.failed = np.zeros(games, dtype=np.int8)
+        self.president_idx = np.zeros(games, dtype=np.int16)
+        self.special_next = np.full(games, -1, dtype=np.int16)
+        self.last_gov = np.full((games, 2), -1, dtype=np.int16)
+        self.round_num = np.ones(games, dtype=np.int16)
+        self.winner = np.zeros(games, dtype=np.int8)  # index into SIM_WIN_CONDITIONS
+
+    STATE = ("role", "hitler", "alive", "deck", "discards", "track", "failed", "president_idx",
+             "special_next", "last_gov", "round_num", "winner", "ids")
+
+    def run(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Play every game out; returns each game's SIM_WIN_CONDITIONS index and round count"""
+        winner = np.zeros(self.games, dtype=np.int8)
+        round_num = np.zeros(self.games, dtype=np.int16)
+        self.ids = np.arange(self.games)
+        for _ in range(SIM_MAX_ROUNDS):
+            live = self.winner == 0
+            if not live.any():
+                break
+            # Once half the batch has finished, drop finished games instead of masking them
+            if live.sum() < self.games // 2:
+                done = ~live
+                winner[self.ids[done]] = self.winner[done]
+                round_num[self.ids[done]] = self.round_num[done]
+                for name in self.STATE:
+                    setattr(self, name, getattr(self, name)[live])
+                self.games = len(self.ids)
+                self.rows = np.arange(self.games)
+                live = live[live]
+            self.play_round(live)
+        winner[self.ids] = self.winner
+        round_num[self.ids] = self.round_num
+        return winner, round_num
+
+    # ----- rules -----
+
+    def _draw(self, live: np.ndarray, k: int) -> np.ndarray:
+        """Fascist count among k cards drawn in live games, reshuffling a short deck first"""
+        short = live & (self.deck.sum(axis=1) < k)
+        self.deck[short] += self.discards[short]
+        self.discards[short] = 0
+        total = self.deck.sum(axis=1)
+        fascists = self.rng.hypergeometric(self.deck[:, 1], self.deck[:, 0], np.minimum(k, total))
+        fascists = np.where(live, fascists, 0)
+        self.deck[:, 1] -= fascists
+        self.deck[:, 0] -= np.where(live, k, 0) - fascists
+        return fascists
+
+    def _enact(self, mask: np.ndarray, fascist: np.ndarray):
+        self.track[mask, 0] += ~fascist[mask]
+        self.track[mask, 1] += fascist[mask]
+        won = mask & (self.track[:, 0] >= self.config["win_liberal"])
+        self.winner[won & (self.winner == 0)] = 1
+        won = mask & (self.track[:, 1] >= self.config["win_fascist"])
+        self.winner[won & (self.winner == 0)] = 3
+        # Table.check_win_conditions also looks at the standing government
+        hitler_chancellor = mask & (self.track[:, 1] >= 3) & (self.last_gov[:, 1] == self.hitler)
+        self.winner[hitler_chancellor & (self.winner == 0)] = 4
+
+    def play_round(self, live: np.ndarray):
+        rng, p, n, rows = self.rng, self.policy, self.n, self.rows
+        team = self.role == 1  # seats that know the fascist team (Hitler doesn't in this repo)
+        fascist_side = self.role > 0
+        alive_count = self.alive.sum(axis=1)
+
+        # President: special election, else the next living seat in order
+        seats = (self.president_idx[:, None] + np.arange(n)) % n
+        step = self.alive[rows[:, None], seats].argmax(axis=1)
+        special = self.special_next >= 0
+        president = np.where(special, self.special_next, seats[rows, step])
+        self.president_idx = np.where(special | ~live, self.president_idx, self.president_idx + step + 1)
+        self.special_next[live] = -1
+
+        # Nomination
+        eligible = self.alive.copy()
+        eligible[rows, president] = False
+        limited = (alive_count > 5) & (self.last_gov[:, 0] >= 0)
+        for i in (0, 1):
+            eligible[limited, self.last_gov[limited, i]] = False
+        pres_team = team[rows, president]
+        allies = eligible & team
+        hitler_ok = eligible[rows, self.hitler] & (self.track[:, 1] >= 3)
+        u = rng.random(self.games)
+        chancellor = _pick(rng, eligible)
+        to_ally = pres_team & allies.any(axis=1) & (u < p["fascist_nominate_ally"])
+        chancellor = np.where(to_ally, _pick(rng, allies), chancellor)
+        to_hitler = pres_team & hitler_ok & (rng.random(self.games) < p["fascist_nominate_hitler"])
+        chancellor = np.where(to_hitler, self.hitler, chancellor)
+
+        # Election
+        ally_in_gov = (team[rows, president] | team[rows, chancellor]
+                       | (self.role[rows, president] == 2) | (self.role[rows, chancellor] == 2))
+        liberal_ja = np.where(self.track[:, 1] >= 3, p["liberal_ja_hitler_zone"], p["liberal_ja"])
+        ja_prob = np.where(team, np.where(ally_in_gov, p["fascist_ja_ally"], p["fascist_ja"])[:, None],
+                           liberal_ja[:, None])
+        ja = ((rng.random((self.games, n)) < ja_prob) & self.alive).sum(axis=1)
+        passed = live & (ja > alive_count / 2)
+        failed = live & ~passed
+
+        self.failed[failed] += 1
+        chaos = failed & (self.failed >= 3)
+        chaos_card = self._draw(chaos, 1) > 0
+        self._enact(chaos, chaos_card)
+        self.failed[chaos] = 0
+
+        self.failed[passed] = 0
+        self.last_gov[passed, 0] = president[passed]
+        self.last_gov[passed, 1] = chancellor[passed]
+        hitler_elected = passed & (self.track[:, 1] >= 3) & (chancellor == self.hitler)
+        self.winner[hitler_elected] = 4
+        legislate = passed & ~hitler_elected
+
+        # Legislative session: president keeps 2 of 3, chancellor enacts 1 of 2
+        drawn_F = self._draw(legislate, 3)
+        drawn_L = 3 - drawn_F
+        pres_F = fascist_side[rows, president]
+        throw_L = np.where(pres_F, (drawn_L > 0) & ((rng.random(self.games) < p["fascist_discard_L"]) | (drawn_F == 0)),
+                           drawn_F == 0)
+        kept_F = drawn_F - ~throw_L
+        chan_F = fascist_side[rows, chancellor]
+        enact_F = np.where(chan_F, (kept_F == 2) | ((kept_F == 1) & (rng.random(self.games) < p["fascist_enact_F"])),
+                           kept_F == 2)
+
+        # Veto: a liberal-acting chancellor stuck with two fascists asks, anyone but a fascist agrees
+        veto = legislate & (self.track[:, 1] >= self.veto_threshold) & (kept_F == 2) & ~chan_F & ~team[rows, president]
+        self.discards[legislate, 0] += throw_L[legislate]
+        self.discards[legislate, 1] += ~throw_L[legislate]
+        self.discards[veto, 1] += 2
+        self.failed[veto] += 1
+        enact = legislate & ~veto
+        self.discards[enact, 0] += ((2 - kept_F) - ~enact_F)[enact]
+        self.discards[enact, 1] += (kept_F - enact_F)[enact]
+        self._enact(enact, enact_F)
+
+        # Executive action for the fascist policy just enacted
+        power = self.power[self.track[:, 1]]
+        act = enact & enact_F & (self.winner == 0)
+        others = self.alive.copy()
+        others[rows, president] = False
+
+        special = act & (power == "SPECIAL_ELECTION")
+        self.special_next[special] = _pick(rng, others)[special]
+
+        execute = act & (power == "EXECUTION")
+        targets = np.where((team[rows, president] & (others & ~fascist_side).any(axis=1))[:, None],
+                           others & ~fascist_side, others)
+        victim = _pick(rng, targets)
+        self.alive[execute, victim[execute]] = False
+        self.winner[execute & (victim == self.hitler)] = 2
+
+        self.round_num[live & (self.winner == 0)] += 1
+
+
+def simulate(counts: List[int], games: int, seed: Optional[int] = None, policy: Optional[Dict] = None,
+             veto_threshold: int = VETO_THRESHOLD, chunk: int = 200_000) -> Dict[int, Dict]:
+    """Win-rate table: for each player count, how `games` lockstep games ended"""
+    rng = np.random.default_rng(seed)
+    table = {}
+    for n in counts:
+        outcomes = np.zeros(len(SIM_WIN_CONDITIONS), dtype=np.int64)
+        rounds = 0
+        for start in range(0, games, chunk):
+            winner, round_num = LockstepSim(n, min(chunk, games - start), rng, policy,
+                                            veto_threshold=veto_threshold).run()
+            outcomes += np.bincount(winner, minlength=len(SIM_WIN_CONDITIONS))
+            rounds += int(round_num.sum())
+        table[n] = {
+            "games": games,
+            "liberal_win_rate": float(outcomes[1] + outcomes[2]) / games,
+            "win_conditions": {SIM_WIN_CONDITIONS[i]: int(outcomes[i]) for i in range(1, len(outcomes))},
+            "unfinished": int(outcomes[0]),
+            "avg_rounds": rounds / games,
+        }
+    return table
 
-        table.special_election_next = target_name
-        print(f"➜ {target_name} will be next President")
 
-    elif power == "EXECUTION":
-        # Critical discussion before execution
-        open_discussion(table, f"{president.name} must execute someone. This is crucial!", min_speakers=2,
-                        max_speakers=5)
+def run_simulation(args):
+    counts = sorted(BOARD_CONFIGS) if args.players == "all" else [int(n) for n in args.players.split(",")]
+    policy = {}
+    for item in args.sim_policy or []:
+        key, _, value = item.partition("=")
+        if key not in SIM_POLICY:
+            raise ValueError(f"unknown policy knob {key!r}; have {', '.join(SIM_POLICY)}")
+        policy[key] = float(value)
+
+    start = time.perf_counter()
+    table = simulate(counts, args.simulate, seed=args.seed, policy=policy, veto_threshold=args.veto_threshold)
+    elapsed = time.perf_counter() - start
+
+    total = args.simulate * len(counts)
+    print(f"{total} games in {elapsed:.1f}s ({total / elapsed * 60 / 1e6:.1f}M games/min)")
+    print(f"{'players':>8} {'lib win':>8} {'L pol':>7} {'H exec':>7} {'F pol':>7} {'H chan':>7} {'rounds':>7}")
+    for n, row in table.items():
+        share = {k: v / row["games"] for k, v in row["win_conditions"].items()}
+        print(f"{n:>8} {row['liberal_win_rate']:>8.1%} {share['LIBERAL_POLICY']:>7.1%} "
+              f"{share['HITLER_EXECUTED']:>7.1%} {share['FASCIST_POLICY']:>7.1%} "
+              f"{share['HITLER_CHANCELLOR']:>7.1%} {row['avg_rounds']:>7.1f}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(table, f, indent=2)
+    return table
 
-        if president.name == "YOU":
-            while True:
-                target_name = input("Execute: ").strip()
-                if target_name in [p.name for p in alive_players]:
-                    break
-        else:
-            decision = ai_decide(president, table, "execute", "Choose who to execute")
-            target_name = decision.target or random.choice([p.name for p in alive_players])
-            if decision.text:
-                table.add_chat(president.name, decision.text)
 
-        target = table.players[target_name]
-        target.alive = False
-        table.execution_history.append(target_name)
+# ================== CHECKPOINTS ==================
 
-        print(f"\n💀 {target_name} has been EXECUTED!")
+SNAPSHOT_VERSION = 3
 
-        # Immediate reactions
-        open_discussion(table, f"Reaction to {target_name}'s execution", min_speakers=1, max_speakers=3)
 
-        if target.role == "H":
-            return "HITLER_EXECUTED"
+def _log_probs_state(log_probs: np.ndarray) -> List[Optional[float]]:
+    # JSON has no -inf; ruled-out assignments are stored as null
+    return [None if math.isinf(x) else float(x) for x in log_probs]
 
-    return None
 
+def _player_state(player: Player) -> Dict:
+    memory = player.memory
+    return {
+        "name": player.name, "role": player.role, "personality": player.personality,
+        "memory": {"heap": memory.heap, "seq": memory.seq},
+        "investigated_players": player.investigated_players, "alive": player.alive,
+        "term_limited": player.term_limited, "last_spoke": player.last_spoke,
+        "belief": _log_probs_state(player.belief.engine.log_probs) if player.belief else None,
+    }
 
-# ================== MAIN GAME ==================
 
-def setup_game():
-    """Initialize game"""
-    print("=" * 60)
-    print(" SECRET HITLER ")
-    print("=" * 60)
+def snapshot_state(engine: GameEngine) -> Dict:
+    """Everything needed to rebuild a game, as plain JSON-ready data.
+
+    Derived state (board config, prompt prefixes, log indexes) is left out
+    and recomputed on load.
+    """
+    table = engine.table
+    return {
+        "version": SNAPSHOT_VERSION,
+        "rng": random.getstate(),
+        "table": {
+            "order": table.order, "player_count": table.player_count,
+            "players": [_player_state(p) for p in table.players.values()],
+            "deck": table.deck, "discards": table.discards,
+            "liberal_policies": table.liberal_policies, "fascist_policies": table.fascist_policies,
+            "president_idx": table.president_idx, "special_election_next": table.special_election_next,
+            "last_government": table.last_government, "failed_elections": table.failed_elections,
+            "round_num": table.round_num, "phase": table.phase,
+            "log": {"maxlen": table.log.entries.maxlen, "seq": table.log.seq,
+                    "entries": [entry.to_dict() for entry in table.log]},
+            "chat_folded": table.chat_folded, "chat_summary": asdict(table.chat_summary),
+            "chat_token_budget": table.chat_token_budget, "token_usage": table.token_usage,
+            "veto_enabled": table.veto_enabled, "interaction_count": table.interaction_count,
+        },
+        "engine": {
+            "pending": [asdict(d) for d in engine.pending],
+            "events": [asdict(e) for e in engine.events],
+            "winner": engine.winner,
+            "president": engine.president.name if engine.president else None,
+            "chancellor": engine.chancellor.name if engine.chancellor else None,
+            "cards": engine.cards, "votes": engine.votes,
+        },
+    }
+
+
+def _restore_player(state: Dict) -> Player:
+    player = Player(name=state["name"], role=state["role"], personality=state["personality"])
+    memory = player.memory
+    memory.heap = [tuple(entry) for entry in state["memory"]["heap"]]
+    memory.seq = state["memory"]["seq"]
+    player.investigated_players = state["investigated_players"]
+    player.alive = state["alive"]
+    player.term_limited = state["term_limited"]
+    player.last_spoke = state["last_spoke"]
+    return player
+
+
+def restore_state(state: Dict) -> GameEngine:
+    """Rebuild the engine described by snapshot_state, including the global RNG state"""
+    if state.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"snapshot version {state.get('version')}, expected {SNAPSHOT_VERSION}")
+    ts = state["table"]
+    players = {p["name"]: _restore_player(p) for p in ts["players"]}
+    table = Table(players=players, order=ts["order"], player_count=ts["player_count"],
+                  config=BOARD_CONFIGS[ts["player_count"]])
+    for name in ("deck", "discards", "liberal_policies", "fascist_policies", "president_idx",
+                 "special_election_next", "failed_elections", "round_num", "phase", "chat_folded",
+                 "chat_token_budget", "veto_enabled", "interaction_count"):
+        setattr(table, name, ts[name])
+    table.last_government = tuple(ts["last_government"]) if ts["last_government"] else None
+    table.chat_summary = ChatSummary(**ts["chat_summary"])
+    table.token_usage = [tuple(u) for u in ts["token_usage"]]
+    table.log = EventLog(maxlen=ts["log"]["maxlen"])
+    for entry in ts["log"]["entries"]:
+        table.log.seq = entry["seq"]
+        table.log.append(entry["round"], entry["phase"], entry["kind"], entry["actors"], **entry["data"])
+    table.log.seq = ts["log"]["seq"]
+
+    fascists = table.config["fascist_count"] + 1
+    for p in ts["players"]:
+        player = players[p["name"]]
+        compile_prompt_prefix(player, table)
+        if p["belief"] is not None and predictor is not None:
+            player.belief = Belief(player.name, table.order, fascists, player.role)
+            player.belief.engine.log_probs = np.array([-np.inf if x is None else x for x in p["belief"]])
+
+    es = state["engine"]
+    engine = GameEngine.__new__(GameEngine)
+    engine.table = table
+    engine.pending = [Decision(**{**d, "government": tuple(d["government"]) if d["government"] else None})
+                      for d in es["pending"]]
+    engine.events = [Event(**e) for e in es["events"]]
+    engine.winner = es["winner"]
+    engine.president = players[es["president"]] if es["president"] else None
+    engine.chancellor = players[es["chancellor"]] if es["chancellor"] else None
+    engine.cards = es["cards"]
+    engine.votes = es["votes"]
+
+    # Last, since building the table above shuffled a throwaway deck
+    version, internal, gauss_next = state["rng"]
+    random.setstate((version, tuple(internal), gauss_next))
+    return engine
+
+
+def save_snapshot(path: str, engine: GameEngine):
+    """Write the game state as gzipped JSON, atomically.
+
+    Plain data rather than pickle: loading a snapshot never runs code, and the
+    format doesn't change with the classes' layout. A mid-game snapshot is a
+    few KB.
+    """
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=1) as f:
+        json.dump(snapshot_state(engine), f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def load_snapshot(path: str) -> GameEngine:
+    """Restore a game saved by save_snapshot, including the global RNG state"""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        state = json.load(f)
+    try:
+        return restore_state(state)
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}") from None
 
-    while True:
-        try:
-            total_players = int(input("Total players (5-10): "))
-            if 5 <= total_players <= 10:
-                break
-        except ValueError:
-            pass
 
-    player_name = input("Your name: ").strip() or "Player"
+# ================== MAIN GAME ==================
+
+def create_table(total_players: int, human_name: Optional[str] = None, beliefs: bool = True) -> Table:
+    """Deal roles and seat players; with a human_name one seat is the human "YOU".
 
-    # Setup players
-    personalities = random.sample(Personality.PROFILES, total_players - 1)
+    `beliefs` gives AI seats a Belief - only LLM-driven seats read it.
+    """
+    ai_count = total_players - 1 if human_name else total_players
+    personalities = random.sample(Personality.PROFILES, ai_count)
     config = BOARD_CONFIGS[total_players]
     fascist_count = config["fascist_count"]
 
@@ -728,11 +2537,12 @@ def setup_game():
     players = {}
 
     # Human player
-    players["YOU"] = Player(
-        name="YOU",
-        role=roles.pop(),
-        personality={"name": player_name, "occupation": "Human Player", "trait": "adaptive"}
-    )
+    if human_name:
+        players["YOU"] = Player(
+            name="YOU",
+            role=roles.pop(),
+            personality={"name": human_name, "occupation": "Human Player", "trait": "adaptive"}
+        )
 
     # AI players
     for personality in personalities:
@@ -745,16 +2555,33 @@ def setup_game():
 
     table = Table(players=players, order=order, player_count=total_players, config=config)
 
-    # Initialize fascist knowledge
+    # Fascist knowledge (teammates, Hitler) lives in each player's static prompt prefix
     for player in players.values():
-        teammates = player.visible_teammates(players, total_players)
-        if teammates:
-            for teammate in teammates:
-                player.remember(f"{teammate} is on my team", importance=5)
+        compile_prompt_prefix(player, table)
+        if beliefs and predictor is not None and player.role != "F" and player.name != "YOU":
+            player.belief = Belief(player.name, order, fascist_count + 1, player.role)
 
     return table
 
 
+def setup_game():
+    """Initialize game"""
+    print("=" * 60)
+    print(" SECRET HITLER ")
+    print("=" * 60)
+
+    while True:
+        try:
+            total_players = int(ask("Total players (5-10): "))
+            if 5 <= total_players <= 10:
+                break
+        except ValueError:
+            pass
+
+    player_name = ask("Your name: ").strip() or "Player"
+    return create_table(total_players, human_name=player_name)
+
+
 def reveal_roles(table: Table):
     """Show role to human player"""
     human = table.players["YOU"]
@@ -769,18 +2596,16 @@ def reveal_roles(table: Table):
     elif human.role == "F":
         print("🔴 You are a FASCIST")
         print("Win: Enact 6 Fascist policies OR elect Hitler as Chancellor (after 3 Fascist)")
-        teammates = human.visible_teammates(table.players, table.player_count)
-        if teammates:
-            print(f"Your team: {', '.join(teammates)}")
-            hitler = next((p.name for p in table.players.values() if p.role == "H"), None)
-            if hitler:
-                print(f"Hitler is: {hitler} - Protect them!")
+        if human.teammates:
+            print(f"Your team: {', '.join(human.teammates)}")
+            if human.known_hitler:
+                print(f"Hitler is: {human.known_hitler} - Protect them!")
     else:
         print("💀 You are HITLER")
         print("Win: Get elected Chancellor after 3 Fascist policies")
         print("Act Liberal! The Fascists know who you are.")
 
-    input("\nPress Enter to start...")
+    ask("\nPress Enter to start...")
     print("\n" * 2)
 
 
@@ -810,62 +2635,89 @@ def display_board(table: Table):
         print(f"{status} {name} ({player.personality['occupation']}){term}")
 
 
-def run_game(table: Table):
-    """Main game loop"""
-    reveal_roles(table)
+def show_event(table: Table, event: Event):
+    """Console rendering of engine events"""
+    kind, data = event.kind, event.data
 
-    # Opening discussion
-    print("\n" + "=" * 60)
-    print("The game begins! Let's see who we can trust...")
-    open_discussion(table, "Opening thoughts", max_speakers=3)
-
-    while True:
+    if kind == "game_start":
+        print("\n" + "=" * 60)
+        print("The game begins! Let's see who we can trust...")
+    elif kind == "discussion":
+        open_discussion(table, data["topic"], min_speakers=data["min_speakers"], max_speakers=data["max_speakers"])
+    elif kind == "round":
         display_board(table)
-
-        # Determine president
-        if table.special_election_next:
-            president_name = table.special_election_next
-            table.special_election_next = None
-            print(f"\n[SPECIAL] {president_name} is President")
-        else:
-            while True:
-                president_name = table.order[table.president_idx % len(table.order)]
-                table.president_idx += 1
-                if table.players[president_name].alive:
-                    break
-
-        president = table.players[president_name]
-
-        # Nomination and voting
-        chancellor = nomination_phase(table, president)
-        if not chancellor:
-            continue
-
-        elected = voting_phase(table, president, chancellor)
-
-        if elected:
-            # Check Hitler win
-            if table.fascist_policies >= 3 and chancellor.role == "H":
-                win_condition = "HITLER_CHANCELLOR"
-            else:
-                legislative_phase(table, president, chancellor)
-                win_condition = table.check_win_conditions()
-
-                if not win_condition:
-                    power = table.get_current_power()
-                    if power:
-                        result = execute_power(table, president, power)
-                        if result:
-                            win_condition = result
+    elif kind == "president" and data["special"]:
+        print(f"\n[SPECIAL] {data['name']} is President")
+    elif kind == "nominating":
+        print(f"\n{'=' * 60}")
+        print(f"🎩 President {data['president']} must nominate a Chancellor")
+        print(f"Eligible: {', '.join(data['eligible'])}")
+    elif kind == "chat":
+        print(f"  {data['speaker']}: {data['text']}")
+    elif kind == "nomination":
+        print(f"\n➜ {data['president']} nominates {data['chancellor']} as Chancellor")
+    elif kind == "election":
+        print(f"\n{'=' * 60}")
+        print(f"🗳️ VOTE on {data['president']} (President) + {data['chancellor']} (Chancellor)")
+        print("\n[Voting]")
+    elif kind == "vote_result":
+        print("\nResults:")
+        for name, vote in data["votes"].items():
+            print(f"  {name}: {'Ja ✓' if vote else 'Nein ✗'}")
+        print(f"\n{'✅ PASSED' if data['passed'] else '❌ FAILED'}: {data['ja']}/{data['total']} Ja votes")
+    elif kind == "chaos":
+        print("\n⚠️ CHAOS! Three failed elections!")
+    elif kind == "reshuffle":
+        print(f"♻️ Reshuffling {data['cards']} cards...")
+    elif kind == "legislative":
+        print(f"\n{'=' * 60}")
+        print("📋 LEGISLATIVE SESSION")
+    elif kind == "cards_passed":
+        print("President passes 2 cards to Chancellor...")
+        if data["veto_enabled"]:
+            print("⚠️ Veto power ACTIVE")
+    elif kind == "veto_proposed":
+        print(f"{data['chancellor']} proposes VETO!")
+    elif kind == "veto":
+        print("✅ Veto approved!" if data["approved"] else "❌ Veto rejected")
+    elif kind == "policy":
+        if data["policy"] == "L":
+            print(f"📘 LIBERAL policy enacted! ({data['liberal']}/5)")
         else:
-            win_condition = None
-
-        if win_condition:
-            display_endgame(table, win_condition)
-            break
+            print(f"📕 FASCIST policy enacted! ({data['fascist']}/6)")
+        if data["president"] != "CHAOS":
+            print("\n[Policy Discussion]")
+    elif kind == "power":
+        print(f"\n{'=' * 60}")
+        print(f"⚡ PRESIDENTIAL POWER: {data['power']}")
+    elif kind == "investigation" and data["president"] == "YOU":
+        print(f"\n🔍 {data['target']} is {data['party']}")
+    elif kind == "special_election":
+        print(f"➜ {data['target']} will be next President")
+    elif kind == "execution":
+        print(f"\n💀 {data['target']} has been EXECUTED!")
+    elif kind == "round_end":
+        ask("\nPress Enter for next round...")
+
+
+def run_game(table: Table, checkpoint: Optional[str] = None, engine: Optional[GameEngine] = None):
+    """Console client: the human plays through ConsoleAgent, everyone else through the LLM.
+
+    Pass a restored `engine` to pick a game back up where its snapshot left off.
+    """
+    reveal_roles(table)
 
-        table.round_num += 1
-        input("\nPress Enter for next round...")
+    if engine is None:
+        engine = GameEngine(table)
+    else:
+        print(f"\nResuming in round {table.round_num} ({table.phase})")
+        display_board(table)
+    agents = {name: ConsoleAgent() if name == "YOU" else LLMAgent() for name in table.players}
+    win_condition = play_game(engine, agents, on_event=lambda event: show_event(table, event),
+                              checkpoint=checkpoint)
+    if checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    display_endgame(table, win_condition)
 
 
 def display_endgame(table: Table, win_condition: str):
@@ -889,19 +2741,216 @@ def display_endgame(table: Table, win_condition: str):
         role_name = {"L": "Liberal", "F": "Fascist", "H": "HITLER"}[player.role]
         print(f"  {name}: {role_name}")
 
+    print("\nHOW IT WENT:")
+    kinds = ("policy", "veto", "investigation", "special_election", "execution")
+    for entry in heapq.merge(*(table.log.query(kind=k) for k in kinds), key=lambda e: e.seq):
+        print(f"  Round {entry.round}: {entry.describe()}")
+
+    if table.token_usage:
+        print()
+        show_token_usage(table.token_usage)
+
+
+def show_token_usage(usage: List[Tuple[str, str, int, int]], by: Tuple[str, ...] = ("call", "player")):
+    """Totals plus a breakdown by call type and/or player, heaviest prompt use first"""
+    calls = len(usage)
+    prompt_tokens = sum(u[2] for u in usage)
+    completion_tokens = sum(u[3] for u in usage)
+    print(f"LLM calls: {calls} | prompt tokens: {prompt_tokens} (avg {prompt_tokens // calls}) "
+          f"| completion tokens: {completion_tokens}")
+
+    for key in by:
+        column = 1 if key == "call" else 0
+        totals = defaultdict(lambda: [0, 0, 0])
+        for u in usage:
+            row = totals[u[column]]
+            row[0] += 1
+            row[1] += u[2]
+            row[2] += u[3]
+        print(f"  {'by ' + key:<16} {'calls':>6} {'prompt':>9} {'share':>6} {'completion':>11}")
+        for name, (n, prompt, completion) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            share = prompt / prompt_tokens if prompt_tokens else 0.0
+            print(f"  {name:<16} {n:>6} {prompt:>9} {share:>6.0%} {completion:>11}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Secret Hitler with LLM players")
+    parser.add_argument("--backend", choices=["openai", "fake"], default="openai",
+                        help="where AI decisions come from (fake = offline stand-in)")
+    parser.add_argument("--model", default=MODEL, help=f"OpenAI model (default {MODEL})")
+    parser.add_argument("--fake-latency", type=float, default=0.0, help="fake backend median latency in seconds")
+    parser.add_argument("--fake-jitter", type=float, default=0.5, help="fake backend lognormal sigma")
+    parser.add_argument("--fake-error-rate", type=float, default=0.0, help="fraction of fake calls that fail")
+    parser.add_argument("--fake-timeout", type=float, default=None, help="fake calls slower than this time out")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the fake backend")
+    parser.add_argument("--chat-budget", type=int, default=CHAT_TOKEN_BUDGET,
+                        help=f"estimated tokens of chat per prompt (default {CHAT_TOKEN_BUDGET})")
+    parser.add_argument("--record", metavar="PATH", help="record the seed, LLM exchanges and your input to a cassette")
+    parser.add_argument("--replay", metavar="PATH", help="re-run a recorded cassette without any API calls")
+    parser.add_argument("--cache", metavar="PATH", help="SQLite file for caching LLM responses")
+    parser.add_argument("--cache-ttl", type=float, default=None, help="seconds before a cached response expires")
+    parser.add_argument("--cache-max-mb", type=float, default=64.0, help="cache size cap in MB (default 64)")
+    parser.add_argument("--cache-deterministic-only", action="store_true",
+                        help="only cache votes, discards, enactments and veto responses")
+    parser.add_argument("--export-log", metavar="PATH", help="write the game's event log as JSON lines")
+    parser.add_argument("--tournament", type=int, default=0, metavar="N",
+                        help="self-play N all-AI games on a process pool and report win rates")
+    parser.add_argument("--players", default="all",
+                        help="tournament player counts, e.g. 5,7,10 (default all of 5-10)")
+    parser.add_argument("--agents", default="random",
+                        help="tournament agents: random, llm, or per team like L=llm,F=random")
+    parser.add_argument("--workers", type=int, default=None, help="tournament processes (default: CPU count)")
+    parser.add_argument("--tournament-out", metavar="PATH", help="stream per-game results here as JSON lines")
+    parser.add_argument("--simulate", type=int, default=0, metavar="N",
+                        help="run N vectorized games per player count and print win rates")
+    parser.add_argument("--sim-policy", action="append", metavar="KNOB=P",
+                        help="override a simulator policy probability (repeatable)")
+    parser.add_argument("--veto-threshold", type=int, default=VETO_THRESHOLD,
+                        help=f"fascist policies that unlock veto in the simulator (default {VETO_THRESHOLD})")
+    parser.add_argument("--output", metavar="PATH", help="write the simulator's win-rate table as JSON")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="write call latency/token/fallback metrics at exit (.prom = Prometheus text, "
+                             "else JSON); not collected for --tournament or --simulate runs")
+    parser.add_argument("--metrics-interval", type=float, default=None, metavar="SECONDS",
+                        help="also rewrite the metrics file this often while playing")
+    parser.add_argument("--checkpoint", metavar="PATH", default=CHECKPOINT_PATH,
+                        help=f"snapshot file written at each phase (default {CHECKPOINT_PATH})")
+    parser.add_argument("--no-checkpoint", action="store_true", help="don't write snapshots")
+    parser.add_argument("--resume", action="store_true", help="continue the game saved in the checkpoint file")
+    parser.add_argument("--batch-games", type=int, default=0, metavar="N",
+                        help="play N AI-only games through batch jobs instead of live calls")
+    parser.add_argument("--batch-players", type=int, default=7, help="seats per batch game (default 7)")
+    parser.add_argument("--batch-dir", default="batches", help="where batch input/output files go")
+    parser.add_argument("--batch-poll", type=float, default=30.0, help="seconds between batch status checks")
+    parser.add_argument("--batch-turnaround", type=float, default=0.0,
+                        help="simulated job time for the local batch stand-in (fake backend)")
+    return parser.parse_args(argv)
+
+
+def configure_backend(args):
+    global _cassette
+    if args.replay:
+        _cassette = Cassette(args.replay, "replay")
+        random.seed(_cassette.seed)
+        set_backend(InstrumentedBackend(CassetteBackend(_cassette)))
+        return
+
+    if args.backend == "fake":
+        backend = FakeBackend(latency=args.fake_latency, jitter=args.fake_jitter,
+                              error_rate=args.fake_error_rate, timeout=args.fake_timeout, seed=args.seed)
+    else:
+        backend = OpenAIBackend(model=args.model)
+    if args.cache:
+        backend = CachingBackend(backend, args.cache, ttl=args.cache_ttl,
+                                 max_bytes=int(args.cache_max_mb * 1024 * 1024),
+                                 deterministic_only=args.cache_deterministic_only)
+    if args.record:
+        _cassette = Cassette(args.record, "record", seed=args.seed)
+        random.seed(_cassette.seed)
+        backend = CassetteBackend(_cassette, backend)
+    set_backend(InstrumentedBackend(backend))
+
+
+def run_batch(args):
+    """Nightly-evaluation mode: many AI-only games, decisions sent as batch jobs"""
+    if args.backend == "fake":
+        client = LocalBatchClient(get_backend(), turnaround=args.batch_turnaround)
+    else:
+        client = OpenAIBatchClient(model=args.model)
+
+    tables = []
+    for _ in range(args.batch_games):
+        table = create_table(args.batch_players)
+        table.chat_token_budget = args.chat_budget
+        tables.append(table)
+    winners = run_batch_games(tables, client, args.batch_dir, poll_interval=args.batch_poll)
+    for i, table in enumerate(tables):
+        table.log.dump(os.path.join(args.batch_dir, f"game-{i:04d}.log.jsonl"))
+
+    print(f"\nResults over {len(winners)} games:")
+    for condition, count in sorted(Counter(winners).items()):
+        print(f"  {condition}: {count}")
+    usage = [u for table in tables for u in table.token_usage]
+    if usage:
+        # seat names repeat across games, so only the call types add up meaningfully
+        show_token_usage(usage, by=("call",))
+
+
+def confirm_checkpoint(path: str) -> Optional[bool]:
+    """An unfinished game is saved at `path`: True to resume it, False to start over, None to quit"""
+    print(f"An unfinished game is saved in {path}.")
+    # Never overwrite it on the say-so of piped input
+    if not sys.stdin.isatty():
+        print("Continue it with --resume, or pass --no-checkpoint or another --checkpoint to start a new game.")
+        return None
+    answer = input("Resume it (r), start a new game and overwrite it (n), or quit (q)? ").strip().lower()
+    if answer == "r":
+        return True
+    if answer == "n":
+        return False
+    return None
 
-def main():
+
+def main(argv=None):
     """Entry point"""
+    args = parse_args(argv)
+    if args.metrics and (args.tournament or args.simulate):
+        print("--metrics only covers live and batch games; ignoring it for this run", file=sys.stderr)
+    if args.tournament:
+        run_tournament(args)
+        return
+    if args.simulate:
+        run_simulation(args)
+        return
+    # A replayed cassette is a rerun, not a game worth resuming
+    checkpoint = None if args.no_checkpoint or args.replay else args.checkpoint
+    resume = args.resume
+    if checkpoint and not resume and not args.batch_games and os.path.exists(checkpoint):
+        resume = confirm_checkpoint(checkpoint)
+        if resume is None:
+            return
+    stop_metrics = None
+    if args.metrics and args.metrics_interval:
+        stop_metrics = dump_metrics_every(args.metrics, args.metrics_interval)
     try:
-        table = setup_game()
-        run_game(table)
+        configure_backend(args)
+        if args.batch_games:
+            run_batch(args)
+            return
+        while True:
+            if resume:
+                engine = load_snapshot(args.checkpoint)
+                table = engine.table
+                run_game(table, checkpoint, engine=engine)
+                resume = False
+            else:
+                table = setup_game()
+                table.chat_token_budget = args.chat_budget
+                run_game(table, checkpoint)
+            if args.export_log:
+                table.log.dump(args.export_log)
+
+            cache = find_backend(CachingBackend)
+            if cache is not None:
+                print(f"\nLLM cache: {cache.stats}")
 
-        if input("\nPlay again? (y/n): ").strip().lower() == 'y':
-            main()
+            if ask("\nPlay again? (y/n): ").strip().lower() != 'y':
+                break
     except KeyboardInterrupt:
         print("\n\nGame ended.")
     except Exception as e:
         print(f"\nError: {e}")
+    finally:
+        if stop_metrics is not None:
+            stop_metrics.set()
+        if args.metrics:
+            get_metrics().dump(args.metrics)
+        if checkpoint and os.path.exists(checkpoint):
+            print(f"Progress was saved - continue with --resume (checkpoint {checkpoint})")
+        if _cassette is not None:
+            if _cassette.mode == "replay" and _cassette.misses:
+                print(f"\n⚠️ {_cassette.misses} requests were not on the cassette (game diverged)")
+            _cassette.close()
 
 
 if __name__ == "__main__":